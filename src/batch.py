@@ -0,0 +1,168 @@
+"""Runs many analyses over one pool of worker processes: `python batch.py <analysis files or directories> ...`.
+
+Every job is recorded in a JSON summary (fitness, energies, Boltzmann weights, runtime and wall time). Restarting a
+batch with the same summary skips the jobs that already finished, unless their analysis file has changed since.
+"""
+
+import env  # isort:skip
+
+import os  # isort:skip
+
+# jobs run unattended, so plots are only saved; matplotlib itself is only imported by jobs that plot
+os.environ["MPLBACKEND"] = "Agg"
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import resource
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stderr, redirect_stdout
+from os.path import abspath, basename, dirname, isdir, join
+from traceback import format_exc
+from typing import Any, Dict, List, Optional, Tuple
+
+# imported once here and inherited by every worker process
+from main import ANALYSIS_FILE, main
+
+BATCH_LOG = "batch.log"
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def analysis_file(path: str) -> str:
+    return abspath(join(path, ANALYSIS_FILE) if isdir(path) else path)
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _raise_timeout(signum: int, frame: Any) -> None:
+    raise JobTimeout("time limit exceeded")
+
+
+def run_job(
+    path: str, timeout: Optional[float] = None, memory_mb: Optional[float] = None, started: Optional[Dict] = None
+) -> Dict[str, Any]:
+    """Runs one analysis inside the limits, with its output going to `batch.log` next to the analysis file.
+
+    The job marks itself in `started`, a dictionary shared with the main process, once it reaches a worker.
+    """
+    if started is not None:
+        started[path] = True
+    analysis_dir = dirname(path)
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    start = time.time()
+    try:
+        if memory_mb is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (int(memory_mb * 1024**2), hard))
+        if timeout is not None:
+            signal.signal(signal.SIGALRM, _raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        with open(join(analysis_dir, BATCH_LOG), "w") as log, redirect_stdout(log), redirect_stderr(log):
+            if basename(path) != ANALYSIS_FILE:
+                raise ValueError(f'Analysis files must be named "{ANALYSIS_FILE}"')
+            summary = main(analysis_dir)
+        return {"status": "done", **summary, "wall_time": time.time() - start}
+    except Exception:
+        return {"status": "failed", "error": format_exc(limit=-3), "wall_time": time.time() - start}
+    finally:
+        if timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+class Batch:
+    def __init__(self, paths: List[str], summary_path: str) -> None:
+        self.jobs = list(dict.fromkeys(analysis_file(path) for path in paths))
+        self.summary_path = summary_path
+        self.summary: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(summary_path):
+            with open(summary_path) as f:
+                self.summary = json.load(f)
+
+    def finished(self, path: str) -> bool:
+        entry = self.summary.get(path, {})
+        return entry.get("status") == "done" and entry.get("analysis_digest") == file_digest(path)
+
+    def record(self, path: str, result: Dict[str, Any]) -> None:
+        # a file removed while the batch runs is recorded without a digest, so that its job reruns once it is back
+        self.summary[path] = {**result, "analysis_digest": file_digest(path) if os.path.isfile(path) else None}
+        tmp_path = f"{self.summary_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.summary, f, indent=2)
+        os.replace(tmp_path, self.summary_path)
+
+    def run(
+        self, workers: Optional[int] = None, timeout: Optional[float] = None, memory_mb: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        missing = [path for path in self.jobs if not os.path.isfile(path)]
+        for path in missing:
+            self.record(path, {"status": "failed", "error": f"Analysis file not found: {path}", "wall_time": 0.0})
+            print(f"[failed] {path} (not found)")
+        pending = [path for path in self.jobs if path not in missing and not self.finished(path)]
+        print(f"{len(self.jobs) - len(missing) - len(pending)} of {len(self.jobs)} jobs already finished.")
+        while pending:
+            suspects, pending = self._run_pool(pending, workers, timeout, memory_mb)
+            for path in suspects:
+                # alone in its pool, a job breaking it again is the one killing its worker
+                self._run_pool([path], 1, timeout, memory_mb, isolated=True)
+        return {path: self.summary[path] for path in self.jobs}
+
+    def _run_pool(
+        self,
+        jobs: List[str],
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        memory_mb: Optional[float] = None,
+        isolated: bool = False,
+    ) -> Tuple[List[str], List[str]]:
+        """Runs `jobs` on a fresh pool and records their results.
+
+        A worker dying, e.g. killed by the system when it ran out of memory, breaks the pool and fails every job left
+        in it. Returns the unfinished jobs that had started, one of which killed the worker, and those that had not;
+        an `isolated` job is recorded as failed instead.
+        """
+        suspects, unstarted = [], []
+        start = time.time()
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=workers) as executor:
+            started = manager.dict()
+            futures = {executor.submit(run_job, path, timeout, memory_mb, started): path for path in jobs}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool) and not isolated:
+                        (suspects if path in started else unstarted).append(path)
+                        continue
+                    result = {"status": "failed", "error": f"{type(e).__name__}: {e}", "wall_time": time.time() - start}
+                self.record(path, result)
+                print(f"[{result['status']}] {path} ({result['wall_time']:.2f} seconds)")
+        if suspects or unstarted:
+            print(f"A worker died: rerunning {len(suspects)} started jobs alone and resubmitting {len(unstarted)}.")
+        return suspects, unstarted
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("paths", nargs="+", help="analysis files or directories containing one")
+    parser.add_argument("--workers", type=int, default=None, help="concurrent jobs (default: number of CPUs)")
+    parser.add_argument("--summary", default="batch_summary.json", help="JSON summary, also used to skip finished jobs")
+    parser.add_argument("--timeout", type=float, default=None, help="wall-clock limit per job in seconds")
+    parser.add_argument("--memory-mb", type=float, default=None, help="address space limit per job in megabytes")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    summary = Batch(args.paths, abspath(args.summary)).run(args.workers, args.timeout, args.memory_mb)
+    sys.exit(int(any(entry["status"] != "done" for entry in summary.values())))
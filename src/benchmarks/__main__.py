@@ -0,0 +1,73 @@
+"""Benchmarks of the hot paths on synthetic analyses, run from the src directory.
+
+python -m benchmarks generate <directory> [sizes]      writes a synthetic analysis
+python -m benchmarks run --output <baseline.json> [sizes]  times every hot path on a fresh synthetic analysis
+python -m benchmarks compare <baseline.json> <current.json> [--threshold 0.1]
+"""
+
+import env  # isort:skip
+
+import argparse
+import json
+import sys
+from tempfile import TemporaryDirectory
+from typing import List
+
+from benchmarks.generator import generate
+from benchmarks.suite import compare, run
+
+
+def add_sizes(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--conformers", type=int, default=50, help="number of conformers")
+    parser.add_argument("--modes", type=int, default=100, help="transitions per conformer and spectrum type")
+    parser.add_argument("--grid", type=int, default=1000, help="points of every experimental spectrum")
+    parser.add_argument("--types", nargs="+", default=["VCD", "IR"], help="spectrum types")
+    parser.add_argument("--generations", type=int, default=20, help="generations of the full run")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser("generate", help="write a synthetic analysis")
+    generate_parser.add_argument("directory")
+    add_sizes(generate_parser)
+    run_parser = commands.add_parser("run", help="time every hot path and save the results as a JSON baseline")
+    run_parser.add_argument("--output", default="benchmarks.json", help="JSON results")
+    run_parser.add_argument("--repeats", type=int, default=5, help="timed rounds per benchmark")
+    run_parser.add_argument("--select", nargs="+", default=None, help="only benchmarks containing one of these")
+    add_sizes(run_parser)
+    compare_parser = commands.add_parser("compare", help="flag benchmarks slower than a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="tolerated relative slowdown")
+    return parser.parse_args(argv)
+
+
+def sizes(args: argparse.Namespace) -> dict:
+    return {
+        "n_conformers": args.conformers,
+        "n_modes": args.modes,
+        "n_grid": args.grid,
+        "spectrum_types": args.types,
+        "n_gen": args.generations,
+        "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.command == "generate":
+        print(f"Synthetic analysis written at: {generate(args.directory, **sizes(args))}")
+    elif args.command == "run":
+        with TemporaryDirectory() as directory:
+            results = run(generate(directory, **sizes(args)), sizes(args), args.repeats, args.select)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Benchmark results written at: {args.output}")
+    else:
+        with open(args.baseline) as baseline, open(args.current) as current:
+            regressions = compare(json.load(baseline), json.load(current), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.threshold:.0%}: {regressions}")
+        sys.exit(int(bool(regressions)))
@@ -0,0 +1,135 @@
+import json
+import os
+from os.path import join
+from typing import Dict, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from main import ANALYSIS_FILE
+from overlap.weights import boltzmann_weights
+from spectrum.spectrum import Spectrum
+from spectrum.spectrum_type import SpectrumType, broaden_funcs, prefix_by_type, string_to_spectrum_type
+
+ENERGY_UNIT = "kcal/mol"
+
+
+class SyntheticSettings(NamedTuple):
+    interval: Tuple[float, float]
+    grid_range: Tuple[float, float]
+    hwhm: float
+    intensity: float
+    signed: bool
+
+
+# vibrational spectra in cm^-1, electronic spectra in nm
+synthetic_settings: Dict[SpectrumType, SyntheticSettings] = {
+    SpectrumType.VCD: SyntheticSettings((950, 1850), (900, 1900), 6.0, 50.0, True),
+    SpectrumType.IR: SyntheticSettings((950, 1850), (900, 1900), 6.0, 150.0, False),
+    SpectrumType.ROA: SyntheticSettings((950, 1850), (900, 1900), 6.0, 50.0, True),
+    SpectrumType.ECD: SyntheticSettings((200, 400), (180, 420), 8.0, 50.0, True),
+    SpectrumType.UV: SyntheticSettings((200, 400), (180, 420), 8.0, 0.5, False),
+}
+
+
+def conformer_transitions(
+    type: SpectrumType, n_conformers: int, n_modes: int, rng: np.random.Generator
+) -> npt.NDArray[np.float64]:
+    """(conformers x modes x 2) transitions: shared base modes, shifted and rescaled a little per conformer."""
+    settings = synthetic_settings[type]
+    lower, upper = settings.grid_range
+    margin = 0.05 * (upper - lower)
+    base_freq = np.sort(rng.uniform(lower - margin, upper + margin, n_modes))
+    base_intensity = settings.intensity * rng.gamma(2.0, 0.5, n_modes)
+    freq = base_freq + rng.normal(0.0, 0.01 * (upper - lower), (n_conformers, n_modes))
+    intensity = base_intensity * rng.lognormal(0.0, 0.3, (n_conformers, n_modes))
+    if settings.signed:
+        intensity *= np.where(rng.random((n_conformers, n_modes)) < 0.3, -1.0, 1.0)
+    return np.stack([freq, intensity], axis=-1)
+
+
+def experimental_spectrum(
+    type: SpectrumType,
+    transitions: npt.NDArray[np.float64],
+    weights: npt.NDArray[np.float64],
+    n_grid: int,
+    rng: np.random.Generator,
+    noise: float = 0.02,
+) -> npt.NDArray[np.float64]:
+    """The Boltzmann-weighted broadened conformers on an `n_grid` points grid, with relative Gaussian noise."""
+    settings = synthetic_settings[type]
+    grid = np.linspace(*settings.grid_range, n_grid)
+    vals = sum(
+        weight
+        * broaden_funcs[type](
+            spectrum=Spectrum(conformer[:, 0], conformer[:, 1]),
+            freq_range=settings.interval,
+            hwhm=settings.hwhm,
+            grid=grid,
+            intervals=[],
+        ).vals()
+        for weight, conformer in zip(weights, transitions)
+    )
+    vals = vals + rng.normal(0.0, noise * np.abs(vals).max(), n_grid)
+    return np.column_stack([grid, vals])
+
+
+def generate(
+    directory: str,
+    n_conformers: int = 50,
+    n_modes: int = 100,
+    n_grid: int = 1000,
+    spectrum_types: Sequence[str] = ("VCD", "IR"),
+    genetic_algorithm: str = "PSO",
+    n_gen: int = 20,
+    seed: int = 0,
+) -> str:
+    """Writes a complete synthetic analysis to `directory`: conformer files, experimental spectra and the analysis file.
+
+    Returns the path of the analysis file.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    names = [f"{i:04d}" for i in range(n_conformers)]
+    energies = -8372.9 + rng.uniform(0.0, 3.0, n_conformers)
+    weights = boltzmann_weights(energies, ENERGY_UNIT)
+    spectra_data = []
+    for i, name in enumerate(spectrum_types):
+        type = string_to_spectrum_type(name)
+        transitions = conformer_transitions(type, n_conformers, n_modes, rng)
+        for fname, conformer in zip(names, transitions):
+            np.savetxt(join(directory, f"{prefix_by_type[type]}{fname}"), conformer)
+        np.savetxt(join(directory, f"{name}_EXP"), experimental_spectrum(type, transitions, weights, n_grid, rng))
+        settings = synthetic_settings[type]
+        spectra_data.append(
+            {
+                "type": name,
+                "file": f"{name}_EXP",
+                "mirroring_option": 1.0,
+                "path_length": 1.0,
+                "molar_concentration": 1.0,
+                "hwhm": settings.hwhm,
+                "cutoff_hwhm": None,
+                "interval": list(settings.interval),
+                "scaling_factors": [],
+                "optimise": True,
+                "reference_dendrogram": i == 0,
+            }
+        )
+    analysis = {
+        "energy_uncertainty": 1.0,
+        "genetic_algorithm": genetic_algorithm,
+        "termination_criterion(ngen)": n_gen,
+        "skip_print": True,
+        "energy_unit": ENERGY_UNIT,
+        "objective": "clustering",
+        "dendrogram_threshold": 0.2,
+        "draw_dendrogram": False,
+        "already_broadened": False,
+        "evaluation_mode": "population",
+        "energies": dict(zip(names, energies.tolist())),
+        "spectra_data": spectra_data,
+    }
+    with open(path := join(directory, ANALYSIS_FILE), "w") as f:
+        json.dump(analysis, f, indent=4)
+    return path
@@ -0,0 +1,175 @@
+import platform
+import subprocess
+import sys
+import timeit
+from contextlib import redirect_stdout
+from functools import cached_property
+from os import devnull
+from os.path import abspath, dirname, join
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import scipy
+from pymoo.core.termination import NoTermination
+from scipy.cluster.hierarchy import linkage
+
+from genetic_algorithm.genetic_algorithm import build_algorithm
+from genetic_algorithm.genetic_problem import classic_fitness
+from genetic_algorithm.seed import SEED
+from main import build_objectives, build_problem, main
+from objective.clustering_objective import ClusteringObjective
+from overlap.metrics import dendrogram_tanimoto
+from overlap.weights import boltzmann_weights
+from parameters.input_parameters import InputParameters
+from spectrum.experimental_spectrum import ExperimentalSpectrum
+from spectrum.spectrum import Spectrum
+from spectrum.spectrum_type import broaden_backends, prefix_by_type
+
+# a benchmark prepares its inputs from the dataset and returns the call that is timed
+Benchmark = Callable[["Dataset"], Callable[[], Any]]
+
+
+class Dataset:
+    """Inputs of the benchmarks, built once from a generated analysis file."""
+
+    def __init__(self, analysis_file: str) -> None:
+        self.analysis_file = analysis_file
+        self.directory = dirname(analysis_file)
+
+    @cached_property
+    def ip(self) -> InputParameters:
+        return InputParameters(self.analysis_file)
+
+    @cached_property
+    def objectives(self) -> Dict[str, Any]:
+        return build_objectives(self.ip)
+
+    def raw_conformer(self, spectrum: ExperimentalSpectrum) -> Spectrum:
+        return Spectrum.from_path(
+            join(self.directory, f"{prefix_by_type[spectrum.type]}{next(iter(self.ip.energies))}")
+        )
+
+
+def broadening(backend: str, type_name: str) -> Benchmark:
+    def benchmark(dataset: Dataset) -> Callable[[], Any]:
+        spectrum = next(s for s in dataset.ip.experimental_spectra if s.type.name == type_name)
+        raw, broaden = dataset.raw_conformer(spectrum), broaden_backends[backend][spectrum.type]
+        return lambda: broaden(
+            spectrum=raw,
+            freq_range=spectrum.freq_range,
+            hwhm=spectrum.hwhm,
+            grid=spectrum.freq(),
+            intervals=spectrum.scaling_factors,
+            cutoff=spectrum.cutoff_hwhm,
+        )
+
+    return benchmark
+
+
+def boltzmann(dataset: Dataset) -> Callable[[], Any]:
+    energies, eu = dataset.ip.energies_array(), dataset.ip.eu
+    return lambda: boltzmann_weights(energies, eu)
+
+
+def fitness(dataset: Dataset) -> Callable[[], Any]:
+    energies, candidate, eu = dataset.ip.energies_array(), dataset.ip.candidates[0], dataset.ip.eu
+    return lambda: classic_fitness(energies, candidate, eu)
+
+
+def clustering_linkage(dataset: Dataset) -> Callable[[], Any]:
+    reference = dataset.ip.reference_candidate
+    return lambda: linkage(
+        ClusteringObjective._cluster_input(reference, dendrogram_tanimoto, np.float64),
+        metric=dendrogram_tanimoto,
+        method="complete",
+        optimal_ordering=False,
+    )
+
+
+def ga_generation(dataset: Dataset) -> Callable[[], Any]:
+    """One generation of the analysis' algorithm, without hyperparameter optimization, on its problem."""
+    algorithm = build_algorithm(dataset.ip.genetic_algorithm)
+    problem = build_problem(dataset.ip, dataset.objectives[dataset.ip.objective])
+    algorithm.setup(problem, termination=NoTermination(), seed=SEED, verbose=False)
+    algorithm.next()
+    return algorithm.next
+
+
+def full_run(dataset: Dataset) -> Callable[[], Any]:
+    def run() -> Dict[str, Any]:
+        with open(devnull, "w") as f, redirect_stdout(f):
+            return main(dataset.directory)
+
+    return run
+
+
+def cold_start(dataset: Dataset) -> Callable[[], Any]:
+    """A fresh interpreter importing `main`: the startup every batch job pays before its analysis begins."""
+    source_dir = dirname(dirname(abspath(__file__)))
+    return lambda: subprocess.run([sys.executable, "-c", "import main"], cwd=source_dir, check=True)
+
+
+def benchmarks(dataset: Dataset) -> Dict[str, Benchmark]:
+    """Every hot path, with the broadening kernels of both backends for each spectrum type of the dataset."""
+    return {
+        **{
+            f"broaden/{backend}/{spectrum.type.name}": broadening(backend, spectrum.type.name)
+            for backend in broaden_backends
+            for spectrum in dataset.ip.experimental_spectra
+        },
+        "boltzmann_weights": boltzmann,
+        "classic_fitness": fitness,
+        "linkage": clustering_linkage,
+        "ga_generation": ga_generation,
+        "main": full_run,
+        "cold_start": cold_start,
+    }
+
+
+def measure(call: Callable[[], Any], repeats: int) -> Dict[str, float]:
+    """Seconds per call: the best and the median of `repeats` rounds, each lasting at least 0.2 seconds."""
+    timer = timeit.Timer(call)
+    number, _ = timer.autorange()
+    rounds = np.array(timer.repeat(repeats, number)) / number
+    return {"best": float(rounds.min()), "median": float(np.median(rounds)), "number": number, "repeats": repeats}
+
+
+def run(
+    analysis_file: str, parameters: Dict[str, Any], repeats: int = 5, selected: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    dataset = Dataset(analysis_file)
+    results = {}
+    for name, benchmark in benchmarks(dataset).items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        results[name] = measure(benchmark(dataset), repeats)
+        print(f"{name:<32} {results[name]['best'] * 1e3:>12.4f} ms")
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "parameters": parameters,
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[str]:
+    """Prints the best time of every common benchmark; returns those slower than the baseline by over `threshold`."""
+    if baseline["parameters"] != current["parameters"]:
+        print(f"Warning: the runs used different parameters: {baseline['parameters']} and {current['parameters']}")
+    regressions = []
+    print(f"{'benchmark':<32} {'baseline (ms)':>14} {'current (ms)':>14} {'ratio':>8}")
+    for name in sorted(baseline["benchmarks"].keys() & current["benchmarks"].keys()):
+        old, new = baseline["benchmarks"][name]["best"], current["benchmarks"][name]["best"]
+        flag = ""
+        if new > old * (1 + threshold):
+            regressions.append(name)
+            flag = "REGRESSION"
+        elif new * (1 + threshold) < old:
+            flag = "improved"
+        print(f"{name:<32} {old * 1e3:>14.4f} {new * 1e3:>14.4f} {new / old:>8.3f} {flag}")
+    return sorted(regressions)
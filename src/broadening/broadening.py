@@ -1,12 +1,17 @@
-from ast import List
 from math import sqrt
-from typing import Tuple
+from typing import Callable, List, Optional, Tuple
 
 import numpy as np
 import numpy.typing as npt
 
 from spectrum.spectrum import Spectrum
 
+CUTOFF_HWHM = 15.0
+BLOCK_ELEMENTS = 2**16
+WINDOW_BLOCK = 32
+
+LineShape = Callable[[npt.NDArray[np.single], float], npt.NDArray[np.single]]
+
 
 def get_scale_factor(freq_value: float, scaling_factors: list) -> float:
     """Given a list of shape ((1, 3), n) where [lower, upper, scale_value]"""
@@ -16,40 +21,128 @@ def get_scale_factor(freq_value: float, scaling_factors: list) -> float:
     )
 
 
-def vcd_broaden(
-    spectrum: Spectrum, freq_range: Tuple[float, float], hwhm: float, grid: npt.NDArray[np.float64], intervals: List
-) -> Spectrum:
-    new_x, rs_y = grid.astype(dtype=np.single), np.zeros(grid.shape, dtype=np.single)
-    lower, upper = sorted(freq_range)
-    hwhm_ = 15 * hwhm
-    t_hwhm_2 = np.full([len(new_x)], hwhm**2, dtype=np.single)
-    t_x229600 = (new_x / 229600).astype(np.single)
+def scale_frequencies(freqs: npt.NDArray[np.float64], scaling_factors: list) -> npt.NDArray[np.float64]:
+    """Vectorised `get_scale_factor`: the first [lower, upper, scale_value] with lower < freq <= upper applies."""
+    freqs = np.asarray(freqs, dtype=np.float64)
+    if not scaling_factors:
+        return freqs.copy()
+    bounds = np.unique([bound for lower, upper, _ in scaling_factors for bound in (lower, upper)])
+    midpoints = (bounds[:-1] + bounds[1:]) / 2
+    # scales[k] belongs to the half-open segment (bounds[k - 1], bounds[k]]; out-of-range segments keep a unit scale
+    scales = np.ones(len(bounds) + 1)
+    for lower, upper, scale in reversed(scaling_factors):
+        scales[1:-1][(lower < midpoints) & (midpoints <= upper)] = scale
+    return freqs * scales[np.searchsorted(bounds, freqs, side="left")]
 
-    for i, x_value in enumerate(spectrum.freq()):
-        if (lower - hwhm_) < x_value < (upper + hwhm_):
-            t_y = np.full([len(new_x)], spectrum.vals()[i] / np.pi, dtype=np.single)
-            t_sf = np.full([len(new_x)], get_scale_factor(x_value, intervals), dtype=np.single)
-            rs_y += t_y * t_x229600 * hwhm / ((new_x - t_sf) ** 2 + t_hwhm_2)
 
-    return Spectrum(new_x, rs_y)
+def lorentzian(delta: npt.NDArray[np.single], hwhm: float) -> npt.NDArray[np.single]:
+    """Evaluated in place on `delta`, which is a scratch array owned by the caller."""
+    np.multiply(delta, delta, out=delta)
+    delta += np.single(hwhm**2)
+    return np.divide(np.single(hwhm), delta, out=delta)
 
 
-def ir_broaden(
-    spectrum: Spectrum, freq_range: Tuple[float, float], hwhm: float, grid: npt.NDArray[np.float64], intervals: List
-) -> Spectrum:
-    new_x, ds_y = grid.astype(dtype=np.single), np.zeros(grid.shape, dtype=np.single)
+def gaussian(delta: npt.NDArray[np.single], hwhm: float) -> npt.NDArray[np.single]:
+    """Evaluated in place on `delta`, which is a scratch array owned by the caller."""
+    delta *= np.single(1.0 / hwhm)
+    np.multiply(delta, delta, out=delta)
+    np.negative(delta, out=delta)
+    return np.exp(delta, out=delta)
+
+
+def sum_bands(
+    centers: npt.NDArray[np.single],
+    amplitudes: npt.NDArray[np.single],
+    grid: npt.NDArray[np.single],
+    hwhm: float,
+    line_shape: LineShape,
+    cutoff: Optional[float] = None,
+) -> npt.NDArray[np.single]:
+    """Sums `amplitudes * line_shape(grid - centers)` over all bands, optionally only within `cutoff` hwhm of each."""
+    if cutoff is None:
+        return _sum_bands_dense(centers, amplitudes, grid, hwhm, line_shape)
+    return _sum_bands_windowed(centers, amplitudes, grid, hwhm, line_shape, cutoff * hwhm)
+
+
+def _sum_bands_dense(
+    centers: npt.NDArray[np.single],
+    amplitudes: npt.NDArray[np.single],
+    grid: npt.NDArray[np.single],
+    hwhm: float,
+    line_shape: LineShape,
+) -> npt.NDArray[np.single]:
+    y = np.zeros(grid.shape, dtype=np.single)
+    block = max(1, BLOCK_ELEMENTS // max(1, grid.size))
+    for start in range(0, centers.size, block):
+        delta = grid[np.newaxis, :] - centers[start : start + block, np.newaxis]
+        y += amplitudes[start : start + block] @ line_shape(delta, hwhm)
+    return y
+
+
+def _sum_bands_windowed(
+    centers: npt.NDArray[np.single],
+    amplitudes: npt.NDArray[np.single],
+    grid: npt.NDArray[np.single],
+    hwhm: float,
+    line_shape: LineShape,
+    half_width: float,
+) -> npt.NDArray[np.single]:
+    """Bands are sorted by center so that each block only touches the grid slice spanned by its windows."""
+    grid_order, band_order = np.argsort(grid, kind="stable"), np.argsort(centers, kind="stable")
+    sorted_grid, centers, amplitudes = grid[grid_order], centers[band_order], amplitudes[band_order]
+    lows = np.searchsorted(sorted_grid, centers - half_width, side="left")
+    highs = np.searchsorted(sorted_grid, centers + half_width, side="right")
+    y = np.zeros(grid.shape, dtype=np.single)
+    for start in range(0, centers.size, WINDOW_BLOCK):
+        low, high = lows[start], highs[start : start + WINDOW_BLOCK].max()
+        if low >= high:
+            continue
+        delta = sorted_grid[np.newaxis, low:high] - centers[start : start + WINDOW_BLOCK, np.newaxis]
+        delta[np.abs(delta) > half_width] = np.inf
+        y[low:high] += amplitudes[start : start + WINDOW_BLOCK] @ line_shape(delta, hwhm)
+    unsorted = np.empty_like(y)
+    unsorted[grid_order] = y
+    return unsorted
+
+
+def in_range_bands(
+    spectrum: Spectrum, freq_range: Tuple[float, float], hwhm: float
+) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
     lower, upper = sorted(freq_range)
-    hwhm_ = 15 * hwhm
-    t_hwhm_2 = np.full([len(new_x)], hwhm**2, dtype=np.single)
-    t_x9184 = (new_x / 91.84).astype(np.single)
+    hwhm_ = CUTOFF_HWHM * hwhm
+    freq, vals = spectrum.freq(), spectrum.vals()
+    mask = ((lower - hwhm_) < freq) & (freq < (upper + hwhm_))
+    return freq[mask], vals[mask]
+
+
+def vcd_broaden(
+    spectrum: Spectrum,
+    freq_range: Tuple[float, float],
+    hwhm: float,
+    grid: npt.NDArray[np.float64],
+    intervals: List,
+    cutoff: Optional[float] = None,
+) -> Spectrum:
+    new_x = grid.astype(dtype=np.single)
+    freq, vals = in_range_bands(spectrum, freq_range, hwhm)
+    centers = scale_frequencies(freq, intervals).astype(np.single)
+    rs_y = sum_bands(centers, (vals / np.pi).astype(np.single), new_x, hwhm, lorentzian, cutoff)
+    return Spectrum(new_x, rs_y * (new_x / 229600).astype(np.single), dtype=np.single)
 
-    for i, x_value in enumerate(spectrum.freq()):
-        if (lower - hwhm_) < x_value < (upper + hwhm_):
-            t_y = np.full([len(new_x)], (spectrum.vals()[i] / np.pi), dtype=np.single)
-            t_sf = np.full([len(new_x)], get_scale_factor(x_value, intervals), dtype=np.single)
-            ds_y += t_y * t_x9184 * hwhm / ((new_x - t_sf) ** 2 + t_hwhm_2)
 
-    return Spectrum(new_x, ds_y)
+def ir_broaden(
+    spectrum: Spectrum,
+    freq_range: Tuple[float, float],
+    hwhm: float,
+    grid: npt.NDArray[np.float64],
+    intervals: List,
+    cutoff: Optional[float] = None,
+) -> Spectrum:
+    new_x = grid.astype(dtype=np.single)
+    freq, vals = in_range_bands(spectrum, freq_range, hwhm)
+    centers = scale_frequencies(freq, intervals).astype(np.single)
+    ds_y = sum_bands(centers, (vals / np.pi).astype(np.single), new_x, hwhm, lorentzian, cutoff)
+    return Spectrum(new_x, ds_y * (new_x / 91.84).astype(np.single), dtype=np.single)
 
 
 def ecd_broaden(
@@ -57,18 +150,16 @@ def ecd_broaden(
     hwhm: float,
     grid: npt.NDArray[np.float64],
     intervals: List,
+    cutoff: Optional[float] = None,
     **kwargs,
 ) -> Spectrum:
-    new_x, ecd_y = grid.astype(dtype=np.single), np.zeros(grid.shape, dtype=np.single)
-    rcp_hwhm = 1.0 / hwhm
+    """Gaussian bands underflow in single precision well within CUTOFF_HWHM, so they are always windowed."""
+    new_x = grid.astype(dtype=np.single)
     epsilon_constant = 1.0 / (22.94 * hwhm * sqrt(np.pi))
-
-    for i, x_value in enumerate(spectrum.freq()):
-        energy_nm = np.full([len(new_x)], get_scale_factor(x_value, intervals), dtype=np.single)
-        ecd_delta_epsilon = energy_nm * spectrum.vals()[i] * epsilon_constant
-        ecd_y += ecd_delta_epsilon * np.exp(-(((new_x - energy_nm) * rcp_hwhm) ** 2))
-
-    return Spectrum(new_x, ecd_y)
+    energy_nm = scale_frequencies(spectrum.freq(), intervals).astype(np.single)
+    ecd_delta_epsilon = energy_nm * (spectrum.vals() * epsilon_constant).astype(np.single)
+    ecd_y = sum_bands(energy_nm, ecd_delta_epsilon, new_x, hwhm, gaussian, cutoff or CUTOFF_HWHM)
+    return Spectrum(new_x, ecd_y, dtype=np.single)
 
 
 def uv_broaden(
@@ -76,13 +167,12 @@ def uv_broaden(
     hwhm: float,
     grid: npt.NDArray[np.float64],
     intervals: List,
+    cutoff: Optional[float] = None,
     **kwargs,
 ) -> Spectrum:
-    new_x, uv_y = grid.astype(dtype=np.single), np.zeros(grid.shape, dtype=np.single)
-
-    for i, x_value in enumerate(spectrum.freq()):
-        energy_nm = np.full([len(new_x)], get_scale_factor(x_value, intervals), dtype=np.single)
-        uv_epsilon = 13.064 * energy_nm * energy_nm * spectrum.vals()[i] / hwhm
-        uv_y += uv_epsilon * np.exp(-(((new_x - energy_nm) / hwhm) ** 2))
-
-    return Spectrum(new_x, uv_y)
+    """Gaussian bands underflow in single precision well within CUTOFF_HWHM, so they are always windowed."""
+    new_x = grid.astype(dtype=np.single)
+    energy_nm = scale_frequencies(spectrum.freq(), intervals).astype(np.single)
+    uv_epsilon = np.single(13.064) * energy_nm * energy_nm * (spectrum.vals() / hwhm).astype(np.single)
+    uv_y = sum_bands(energy_nm, uv_epsilon, new_x, hwhm, gaussian, cutoff or CUTOFF_HWHM)
+    return Spectrum(new_x, uv_y, dtype=np.single)
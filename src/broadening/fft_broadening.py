@@ -0,0 +1,125 @@
+from math import sqrt
+from typing import List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from broadening.broadening import (
+    LineShape,
+    ecd_broaden,
+    gaussian,
+    in_range_bands,
+    ir_broaden,
+    lorentzian,
+    scale_frequencies,
+    uv_broaden,
+    vcd_broaden,
+)
+from spectrum.spectrum import Spectrum
+
+# Linear binning displaces a band by at most half a grid step, which changes a Lorentzian or Gaussian peak by
+# roughly (step / hwhm)^2 / 4 of its height. Grids coarser than MAX_STEP_TO_HWHM fall back to direct summation,
+# which keeps the deviation from the direct kernels below MAX_RELATIVE_DEVIATION of the largest band magnitude.
+# A `cutoff` truncates every band at a hard edge, which binning would move by up to half a step, so spectra with a
+# cutoff are broadened by the direct (windowed) kernels. Without one the Gaussian kernels convolve the full bands,
+# which differ from the direct kernels' CUTOFF_HWHM window by less than exp(-CUTOFF_HWHM^2).
+MAX_STEP_TO_HWHM = 0.2
+MAX_RELATIVE_DEVIATION = 2e-2
+UNIFORM_RTOL = 1e-6
+
+
+def fft_compatible(grid: npt.NDArray[np.float64], hwhm: float) -> bool:
+    if grid.size < 3:
+        return False
+    steps = np.diff(grid.astype(np.float64))
+    step = steps.mean()
+    return bool(np.all(np.abs(steps - step) <= UNIFORM_RTOL * abs(step)) and abs(step) <= MAX_STEP_TO_HWHM * hwhm)
+
+
+def fft_sum_bands(
+    centers: npt.NDArray[np.float64],
+    amplitudes: npt.NDArray[np.float64],
+    grid: npt.NDArray[np.float64],
+    hwhm: float,
+    line_shape: LineShape,
+) -> npt.NDArray[np.single]:
+    """Bins the bands onto the uniform `grid` with linear sub-bin weights and convolves them with the line shape."""
+    n = grid.size
+    step = (grid[-1] - grid[0]) / (n - 1)
+    positions = (centers - grid[0]) / step
+    bins = np.floor(positions).astype(np.int64)
+    fractions = positions - bins
+    # extend the binned axis so that bands falling outside the grid still contribute their tails
+    first = min(0, int(bins.min(initial=0)))
+    length = max(n - 1, int(bins.max(initial=0)) + 1) - first + 1
+    binned = np.bincount(bins - first, weights=amplitudes * (1 - fractions), minlength=length)
+    binned += np.bincount(bins + 1 - first, weights=amplitudes * fractions, minlength=length)
+    kernel = line_shape(np.arange(-(length - 1 + first), n - first, dtype=np.float64) * step, hwhm)
+    # scipy.signal takes about half a second to import, so only runs using the fft backend pay for it
+    from scipy.signal import fftconvolve
+
+    return fftconvolve(binned[:length], kernel, mode="full")[length - 1 : length - 1 + n].astype(np.single)
+
+
+def fft_vcd_broaden(
+    spectrum: Spectrum,
+    freq_range: Tuple[float, float],
+    hwhm: float,
+    grid: npt.NDArray[np.float64],
+    intervals: List,
+    cutoff: Optional[float] = None,
+) -> Spectrum:
+    if cutoff is not None or not fft_compatible(grid, hwhm):
+        return vcd_broaden(spectrum, freq_range, hwhm, grid, intervals, cutoff)
+    new_x = grid.astype(dtype=np.single)
+    freq, vals = in_range_bands(spectrum, freq_range, hwhm)
+    rs_y = fft_sum_bands(scale_frequencies(freq, intervals), vals / np.pi, grid, hwhm, lorentzian)
+    return Spectrum(new_x, rs_y * (new_x / 229600).astype(np.single), dtype=np.single)
+
+
+def fft_ir_broaden(
+    spectrum: Spectrum,
+    freq_range: Tuple[float, float],
+    hwhm: float,
+    grid: npt.NDArray[np.float64],
+    intervals: List,
+    cutoff: Optional[float] = None,
+) -> Spectrum:
+    if cutoff is not None or not fft_compatible(grid, hwhm):
+        return ir_broaden(spectrum, freq_range, hwhm, grid, intervals, cutoff)
+    new_x = grid.astype(dtype=np.single)
+    freq, vals = in_range_bands(spectrum, freq_range, hwhm)
+    ds_y = fft_sum_bands(scale_frequencies(freq, intervals), vals / np.pi, grid, hwhm, lorentzian)
+    return Spectrum(new_x, ds_y * (new_x / 91.84).astype(np.single), dtype=np.single)
+
+
+def fft_ecd_broaden(
+    spectrum: Spectrum,
+    hwhm: float,
+    grid: npt.NDArray[np.float64],
+    intervals: List,
+    cutoff: Optional[float] = None,
+    **kwargs,
+) -> Spectrum:
+    if cutoff is not None or not fft_compatible(grid, hwhm):
+        return ecd_broaden(spectrum, hwhm, grid, intervals, cutoff)
+    energy_nm = scale_frequencies(spectrum.freq(), intervals)
+    ecd_delta_epsilon = energy_nm * spectrum.vals() / (22.94 * hwhm * sqrt(np.pi))
+    return Spectrum(
+        grid.astype(np.single), fft_sum_bands(energy_nm, ecd_delta_epsilon, grid, hwhm, gaussian), dtype=np.single
+    )
+
+
+def fft_uv_broaden(
+    spectrum: Spectrum,
+    hwhm: float,
+    grid: npt.NDArray[np.float64],
+    intervals: List,
+    cutoff: Optional[float] = None,
+    **kwargs,
+) -> Spectrum:
+    if cutoff is not None or not fft_compatible(grid, hwhm):
+        return uv_broaden(spectrum, hwhm, grid, intervals, cutoff)
+    energy_nm = scale_frequencies(spectrum.freq(), intervals)
+    uv_epsilon = 13.064 * energy_nm * energy_nm * spectrum.vals() / hwhm
+    return Spectrum(grid.astype(np.single), fft_sum_bands(energy_nm, uv_epsilon, grid, hwhm, gaussian), dtype=np.single)
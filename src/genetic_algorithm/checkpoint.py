@@ -0,0 +1,88 @@
+import os
+import pickle
+import random
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+from pymoo.core.algorithm import Algorithm
+from pymoo.core.callback import Callback
+from pymoo.core.problem import Problem
+from pymoo.core.termination import Termination
+from pymoo.util.misc import termination_from_tuple
+
+# the share of the run time that checkpointing may take
+MAX_OVERHEAD = 0.01
+
+
+class Checkpoint(NamedTuple):
+    """Everything needed to continue a run exactly where it stopped; the problem itself is rebuilt by the caller."""
+
+    fingerprint: str
+    hyperparameters: Optional[Dict[str, Any]]
+    algorithm: Optional[Algorithm]
+    numpy_state: Optional[Tuple]
+    random_state: Optional[Tuple]
+    # seconds the run had been going when it was saved
+    elapsed: float = 0.0
+
+
+def save_checkpoint(
+    path: str,
+    fingerprint: str,
+    hyperparameters: Optional[Dict[str, Any]],
+    algorithm: Optional[Algorithm] = None,
+) -> None:
+    problem = None if algorithm is None else algorithm.problem
+    try:
+        if algorithm is not None:
+            algorithm.problem = None
+        checkpoint = Checkpoint(
+            fingerprint=fingerprint,
+            hyperparameters=hyperparameters,
+            algorithm=algorithm,
+            numpy_state=None if algorithm is None else np.random.get_state(),
+            random_state=None if algorithm is None else random.getstate(),
+            elapsed=0.0 if algorithm is None else time.time() - algorithm.start_time,
+        )
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    finally:
+        if algorithm is not None:
+            algorithm.problem = problem
+
+
+def load_checkpoint(path: str, fingerprint: str) -> Optional[Checkpoint]:
+    """The checkpoint at `path` if it exists and belongs to the same problem."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        checkpoint = pickle.load(f)
+    if checkpoint.fingerprint != fingerprint:
+        print(f"Ignoring checkpoint {path}: it was written for a different problem.")
+        return None
+    return checkpoint
+
+
+def restore(
+    checkpoint: Checkpoint,
+    problem: Problem,
+    termination: Optional[Termination] = None,
+    callback: Optional[Callback] = None,
+) -> Algorithm:
+    """Reattaches `problem` to the checkpointed algorithm and restores the global random states it was saved with.
+
+    The resumed run's `termination` (when given) and `callback` replace the saved ones, and the clock is set so that
+    time budgets count only the time the run had been going, not the time it was down.
+    """
+    algorithm = checkpoint.algorithm
+    algorithm.problem = problem
+    if termination is not None:
+        algorithm.termination = termination_from_tuple(termination)
+    algorithm.callback = Callback() if callback is None else callback
+    algorithm.start_time = time.time() - checkpoint.elapsed
+    np.random.set_state(checkpoint.numpy_state)
+    random.setstate(checkpoint.random_state)
+    return algorithm
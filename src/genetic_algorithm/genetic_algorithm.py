@@ -1,49 +1,162 @@
-from pymoo.algorithms.soo.nonconvex.brkga import BRKGA
-from pymoo.algorithms.soo.nonconvex.de import DE
-from pymoo.algorithms.soo.nonconvex.es import ES
-from pymoo.algorithms.soo.nonconvex.ga import GA
-from pymoo.algorithms.soo.nonconvex.nelder import NelderMead
-from pymoo.algorithms.soo.nonconvex.pattern import PatternSearch
-from pymoo.algorithms.soo.nonconvex.pso import PSO
+import time
+from copy import deepcopy
+from importlib import import_module
+from os.path import basename, dirname, join
+from typing import Any, Dict, NamedTuple, Optional, Union
+
+from pymoo.core.algorithm import Algorithm
+from pymoo.core.callback import Callback
 from pymoo.core.parameters import hierarchical, set_params
 from pymoo.core.result import Result
+from pymoo.core.termination import Termination
 from pymoo.optimize import minimize
 from tqdm import tqdm
 
-from genetic_algorithm.genetic_problem import GeneticProblem
-from genetic_algorithm.hyperparameter import hyperoptimizable, hyperparameter_optimize
+from genetic_algorithm.checkpoint import MAX_OVERHEAD, load_checkpoint, restore, save_checkpoint
+from genetic_algorithm.genetic_problem import GeneticProblem, PopulationGeneticProblem
+from genetic_algorithm.hyperparameter import hyperparameter_optimize, problem_fingerprint
+from genetic_algorithm.island_model import IslandModel
 from genetic_algorithm.seed import SEED
+from genetic_algorithm.termination import stop_reason
+from instrumentation import instrumentation
+
+
+class AlgorithmSpec(NamedTuple):
+    module: str
+    name: str
+    options: Dict[str, Any] = {}
+    hyperoptimizable: bool = True
+    # the whole state is the population, so islands can replace individuals by immigrants
+    migratable: bool = False
+    # the running algorithm can be pickled; the local searches keep their state in generators
+    checkpointable: bool = True
+
 
-ga_map = {
-    "GA": GA(pop_size=500),
-    "BRKGA": BRKGA(),
-    "DE": DE(),
-    "NEDLER_MEAD": NelderMead(),
-    "PSO": PSO(),
-    "PATTERN_SEARCH": PatternSearch(),
-    "ES": ES(),
+ga_map: Dict[str, AlgorithmSpec] = {
+    "GA": AlgorithmSpec("pymoo.algorithms.soo.nonconvex.ga", "GA", {"pop_size": 500}, migratable=True),
+    "BRKGA": AlgorithmSpec("pymoo.algorithms.soo.nonconvex.brkga", "BRKGA", migratable=True),
+    "DE": AlgorithmSpec("pymoo.algorithms.soo.nonconvex.de", "DE", migratable=True),
+    "NEDLER_MEAD": AlgorithmSpec(
+        "pymoo.algorithms.soo.nonconvex.nelder", "NelderMead", hyperoptimizable=False, checkpointable=False
+    ),
+    "PSO": AlgorithmSpec("pymoo.algorithms.soo.nonconvex.pso", "PSO", hyperoptimizable=False),
+    "PATTERN_SEARCH": AlgorithmSpec(
+        "pymoo.algorithms.soo.nonconvex.pattern", "PatternSearch", hyperoptimizable=False, checkpointable=False
+    ),
+    "ES": AlgorithmSpec("pymoo.algorithms.soo.nonconvex.es", "ES", hyperoptimizable=False),
 }
 
 
+def build_algorithm(ga_type: str) -> Algorithm:
+    """Imports and builds only the selected algorithm; every call returns a fresh instance."""
+    spec = ga_map[ga_type]
+    return getattr(import_module(spec.module), spec.name)(**spec.options)
+
+
 class GeneticAlgorithm:
-    def __init__(self, ga_type: str, genetic_problem: GeneticProblem) -> None:
+    def __init__(
+        self,
+        ga_type: str,
+        genetic_problem: Union[GeneticProblem, PopulationGeneticProblem],
+        hyperparameter_storage: Optional[str] = None,
+        hyperparameter_workers: int = 1,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_interval: int = 10,
+        resume: bool = False,
+        hyper_params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """`hyper_params` (flattened, as tuned for another problem of the same algorithm) skip the tuning."""
         self.problem = genetic_problem
-        self.algorithm_type = ga_map[ga_type]
-        self._apply_hyper_params(ga_type)
+        self.ga_type = ga_type
+        self.algorithm_type = build_algorithm(ga_type)
+        self.hyper_params = hyper_params
+        if checkpoint_path is not None and not ga_map[ga_type].checkpointable:
+            raise ValueError(
+                f'Checkpoints cannot save "{ga_type}". Valid options are: '
+                f"{[ga for ga, spec in ga_map.items() if spec.checkpointable]}"
+            )
+        self.checkpoint_interval = checkpoint_interval
+        self.fingerprint = (
+            None
+            if checkpoint_path is None
+            else f"{ga_type}-{type(genetic_problem.objective).__name__}-{problem_fingerprint(genetic_problem)}"
+        )
+        # one checkpoint per problem, so that runs of different problems (e.g. sweep points) never share a file
+        self.checkpoint_path = (
+            None
+            if checkpoint_path is None
+            else join(dirname(checkpoint_path), f"{self.fingerprint}.{basename(checkpoint_path)}")
+        )
+        self.checkpoint = (
+            load_checkpoint(self.checkpoint_path, self.fingerprint) if self.checkpoint_path and resume else None
+        )
+        if self.checkpoint is not None and self.checkpoint.hyperparameters is not None:
+            self.hyper_params = self.checkpoint.hyperparameters
+        if self.hyper_params is not None:
+            set_params(self.algorithm_type, hierarchical(self.hyper_params))
+        else:
+            self._apply_hyper_params(ga_type, hyperparameter_storage, hyperparameter_workers)
+        if self.checkpoint_path is not None and self.checkpoint is None:
+            # a run killed before its first checkpointed generation still keeps the tuned hyperparameters
+            save_checkpoint(self.checkpoint_path, self.fingerprint, self.hyper_params)
 
-    def _apply_hyper_params(self, ga_type: str):
-        if hyperoptimizable(self.algorithm_type):
-            with tqdm(total=1) as pbar:
+    def _apply_hyper_params(self, ga_type: str, storage: Optional[str] = None, workers: int = 1):
+        if ga_map[ga_type].hyperoptimizable:
+            with tqdm(total=1) as pbar, instrumentation.stage("hyperparameter_optimization"):
                 pbar.set_description(f"Applying Hyperparameter optimization to {ga_type}")
-                hyper_res = hyperparameter_optimize(self.algorithm_type, self.problem)
-                set_params(self.algorithm_type, hierarchical(hyper_res.X))
+                self.hyper_params = hyperparameter_optimize(self.algorithm_type, self.problem, storage, workers)
+                set_params(self.algorithm_type, hierarchical(self.hyper_params))
                 pbar.update(1)
 
-    def run(self, **kwargs) -> Result:
-        return minimize(
-            self.problem,
-            self.algorithm_type,
-            seed=SEED,
-            verbose=True,
-            **kwargs,
+    def run_islands(
+        self,
+        termination: Termination,
+        n_islands: int,
+        migration_interval: int,
+        n_migrants: int,
+        topology: str = "ring",
+        callback: Optional[Callback] = None,
+    ) -> Result:
+        if not ga_map[self.ga_type].migratable:
+            raise ValueError(
+                f'Islands cannot run "{self.ga_type}". Valid options are: '
+                f"{[ga for ga, spec in ga_map.items() if spec.migratable]}"
+            )
+        return IslandModel(self.algorithm_type, n_islands, migration_interval, n_migrants, topology).run(
+            self.problem, termination, seed=SEED, verbose=True, callback=callback
         )
+
+    def run(self, **kwargs) -> Result:
+        if self.checkpoint_path is None:
+            res = minimize(
+                self.problem,
+                self.algorithm_type,
+                seed=SEED,
+                verbose=True,
+                **kwargs,
+            )
+        else:
+            res = self._run_with_checkpoints(**kwargs)
+        res.stop_reason = stop_reason(res.algorithm.termination)
+        return res
+
+    def _run_with_checkpoints(self, **kwargs) -> Result:
+        """The loop of `minimize`, saving the algorithm at most every `checkpoint_interval` generations."""
+        if self.checkpoint is not None and self.checkpoint.algorithm is not None:
+            algorithm = restore(self.checkpoint, self.problem, kwargs.get("termination"), kwargs.get("callback"))
+            print(f"Resuming from generation {algorithm.n_gen} of {self.checkpoint_path}")
+        else:
+            algorithm = deepcopy(self.algorithm_type)
+            algorithm.setup(self.problem, seed=SEED, verbose=True, **kwargs)
+        last_saved, save_time = time.time(), 0.0
+        while algorithm.has_next():
+            algorithm.next()
+            # besides the generation interval, saves are spaced so that they take at most MAX_OVERHEAD of the run
+            if algorithm.n_gen % self.checkpoint_interval == 0 and time.time() - last_saved >= save_time / MAX_OVERHEAD:
+                start = time.time()
+                save_checkpoint(self.checkpoint_path, self.fingerprint, self.hyper_params, algorithm)
+                last_saved = time.time()
+                save_time = last_saved - start
+        res = algorithm.result()
+        res.algorithm = algorithm
+        return res
@@ -1,13 +1,29 @@
+import hashlib
+from typing import List, Optional
+
 import numpy as np
 import numpy.typing as npt
+from pymoo.core.problem import Problem
 from pymoo.problems.functional import FunctionalProblem
 
-from objective.objective import Objective
-from overlap.metrics import fitness_tanimoto, tanimoto
+from instrumentation import instrumentation
+from objective.objective import Objective, PopulationFitness
+from overlap.metrics import fitness_tanimoto, gram_tanimoto, low_rank_tanimoto, tanimoto, tanimoto_rows
 from overlap.weights import boltzmann_weights
 from spectrum.experimental_spectrum import ExperimentalSpectrum
 
-_rng = np.random.default_rng(seed=123)
+DROPOUT_SEED = 123
+
+
+def individual_rng(weights: npt.NDArray[np.float64], es: ExperimentalSpectrum) -> np.random.Generator:
+    """Counter-based (Philox) stream keyed by the individual's weights and the spectrum type.
+
+    The draws are a pure function of the individual, so they do not depend on evaluation order or on which process
+    evaluates it.
+    """
+    digest = hashlib.blake2b(np.ascontiguousarray(weights, dtype=np.float64).tobytes(), digest_size=16)
+    digest.update(f"{DROPOUT_SEED}:{es.type.name}".encode())
+    return np.random.Generator(np.random.Philox(key=int.from_bytes(digest.digest(), "little")))
 
 
 def fitness(
@@ -17,11 +33,22 @@ def fitness(
     dropout_percentage: float = 0.08,
 ) -> npt.NDArray[np.float64]:
     weights = boltzmann_weights(x_energies, constant)
-    weights[_rng.random(len(weights)) < dropout_percentage] = 0.0
+    weights[individual_rng(weights, es).random(len(weights)) < dropout_percentage] = 0.0
     spectra_accumulator = es.simulated_vals(weights)
     return tanimoto(spectra_accumulator, es.vals(es.freq_range))
 
 
+def dropout_population_fitness(
+    weights: npt.NDArray[np.float64],
+    es: ExperimentalSpectrum,
+    dropout_percentage: float = 0.08,
+) -> npt.NDArray[np.float64]:
+    dropped = weights.copy()
+    for row, individual in zip(dropped, weights):
+        row[individual_rng(individual, es).random(len(row)) < dropout_percentage] = 0.0
+    return tanimoto_rows(es.simulated_vals(dropped), es.vals(es.freq_range))
+
+
 def classic_fitness(
     x_energies: npt.NDArray[np.float64],
     es: ExperimentalSpectrum,
@@ -31,6 +58,100 @@ def classic_fitness(
     return fitness_tanimoto(spectra_accumulator, es.vals(es.freq_range))
 
 
+def classic_population_fitness(
+    weights: npt.NDArray[np.float64],
+    es: ExperimentalSpectrum,
+) -> npt.NDArray[np.float64]:
+    return 1 + tanimoto_rows(es.simulated_vals(weights), es.vals(es.freq_range))
+
+
+def gram_fitness(
+    x_energies: npt.NDArray[np.float64],
+    es: ExperimentalSpectrum,
+    constant: str = "kcal/mol",
+) -> npt.NDArray[np.float64]:
+    weights = boltzmann_weights(x_energies, constant)
+    return 1 + gram_tanimoto(weights, es.broadened_gram, es.broadened_dot_vals, es.vals_dot_vals)
+
+
+def gram_population_fitness(
+    weights: npt.NDArray[np.float64],
+    es: ExperimentalSpectrum,
+) -> npt.NDArray[np.float64]:
+    return 1 + gram_tanimoto(weights, es.broadened_gram, es.broadened_dot_vals, es.vals_dot_vals)
+
+
+def low_rank_fitness(
+    x_energies: npt.NDArray[np.float64],
+    es: ExperimentalSpectrum,
+    constant: str = "kcal/mol",
+) -> npt.NDArray[np.float64]:
+    weights = boltzmann_weights(x_energies, constant)
+    return 1 + low_rank_tanimoto(weights, es.low_rank.coefficients, es.low_rank_dot_vals, es.vals_dot_vals)
+
+
+def low_rank_population_fitness(
+    weights: npt.NDArray[np.float64],
+    es: ExperimentalSpectrum,
+) -> npt.NDArray[np.float64]:
+    return 1 + low_rank_tanimoto(weights, es.low_rank.coefficients, es.low_rank_dot_vals, es.vals_dot_vals)
+
+
+fitness_map = {
+    "direct": classic_fitness,
+    "gram": gram_fitness,
+    "lowrank": low_rank_fitness,
+    "dropout": fitness,
+}
+
+population_fitness_map = {
+    "direct": classic_population_fitness,
+    "gram": gram_population_fitness,
+    "lowrank": low_rank_population_fitness,
+    "dropout": dropout_population_fitness,
+}
+
+
 class GeneticProblem(FunctionalProblem):
     def __init__(self, objective: Objective) -> None:
         super().__init__(n_var=objective.n_var, objs=objective, xl=objective.lower, xu=objective.upper, type_var=float)
+        self.objective = objective
+
+    def _evaluate(self, x: npt.NDArray[np.float64], out: dict, *args, **kwargs) -> None:
+        with instrumentation.stage("evaluation"):
+            super()._evaluate(x, out, *args, **kwargs)
+
+
+class PopulationGeneticProblem(Problem):
+    """Evaluates the whole population at once, in tiles of at most `tile_size` rows and `memory_budget` bytes."""
+
+    def __init__(
+        self,
+        objective: Objective,
+        population_fitness: PopulationFitness = classic_population_fitness,
+        memory_budget: Optional[int] = None,
+        tile_size: Optional[int] = None,
+    ) -> None:
+        super().__init__(n_var=objective.n_var, n_obj=1, xl=objective.lower, xu=objective.upper, vtype=float)
+        self.objective = objective
+        self.population_fitness = population_fitness
+        self.tile_size = self._tile_size(objective, memory_budget, tile_size)
+
+    @staticmethod
+    def _tile_size(objective: Objective, memory_budget: Optional[int], tile_size: Optional[int]) -> Optional[int]:
+        if memory_budget is None:
+            return tile_size
+        n_conformers = objective.get_chromosome(np.zeros(objective.n_var)).size
+        n_grid = max(candidate.broadened_vals.shape[1] for candidate in objective.candidates)
+        row_bytes = 2 * (n_conformers + n_grid) * np.dtype(np.float64).itemsize
+        return min(max(1, int(memory_budget // row_bytes)), tile_size or np.iinfo(np.int64).max)
+
+    def _tiles(self, x: npt.NDArray[np.float64]) -> List[npt.NDArray[np.float64]]:
+        tile_size = self.tile_size or max(1, len(x))
+        return [x[start : start + tile_size] for start in range(0, len(x), tile_size)]
+
+    def _evaluate(self, x: npt.NDArray[np.float64], out: dict, *args, **kwargs) -> None:
+        with instrumentation.stage("evaluation", len(x)):
+            out["F"] = np.concatenate(
+                [self.objective.process_population(tile, self.population_fitness) for tile in self._tiles(x)]
+            )
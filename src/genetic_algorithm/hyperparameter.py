@@ -1,34 +1,119 @@
-from typing import Union
+import hashlib
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from typing import TYPE_CHECKING, Any, Dict, Optional, Union
 
+import numpy as np
 from pymoo.algorithms.base.genetic import GeneticAlgorithm
 from pymoo.algorithms.base.local import LocalSearch
-from pymoo.algorithms.hyperparameters import HyperparameterProblem, SingleObjectiveSingleRun
-from pymoo.algorithms.soo.nonconvex.es import ES
-from pymoo.algorithms.soo.nonconvex.nelder import NelderMead
-from pymoo.algorithms.soo.nonconvex.optuna import Optuna
-from pymoo.algorithms.soo.nonconvex.pattern import PatternSearch
-from pymoo.algorithms.soo.nonconvex.pso import PSO
 from pymoo.core.algorithm import Algorithm
-from pymoo.core.result import Result
+from pymoo.core.parameters import flatten, get_params, hierarchical, set_params
+from pymoo.core.variable import Binary, Choice, Integer, Real, Variable
 from pymoo.optimize import minimize
 
-from genetic_algorithm.genetic_problem import GeneticProblem
+from genetic_algorithm.genetic_problem import GeneticProblem, PopulationGeneticProblem
 from genetic_algorithm.seed import SEED
 
+if TYPE_CHECKING:
+    from optuna.trial import Trial
 
-def hyperoptimizable(algorithm_type: Union[GeneticAlgorithm, LocalSearch, Algorithm]) -> bool:
-    return not any(isinstance(algorithm_type, cls) for cls in (PatternSearch, PSO, NelderMead, ES))
+N_TRIALS = 50
+TRIAL_EVALUATIONS = 500
+
+
+def problem_fingerprint(problem: Union[GeneticProblem, PopulationGeneticProblem]) -> str:
+    """Digest of what the tuned hyperparameters depend on: the search space and the spectra that are fitted."""
+    digest = hashlib.sha256(f"{problem.n_var}".encode())
+    for array in (problem.xl, problem.xu):
+        digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    for candidate in problem.objective.candidates:
+        digest.update(f"{candidate.type.name}:{sorted(candidate.freq_range)}:{candidate.hwhm}".encode())
+        for array in (candidate.vals(candidate.freq_range), candidate.broadened_vals):
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _suggest(trial: "Trial", name: str, variable: Variable) -> Any:
+    if isinstance(variable, Real):
+        return trial.suggest_float(name, *variable.bounds)
+    elif isinstance(variable, Integer):
+        return trial.suggest_int(name, *variable.bounds)
+    elif isinstance(variable, Choice):
+        return trial.suggest_categorical(name, variable.options)
+    elif isinstance(variable, Binary):
+        return trial.suggest_categorical(name, [False, True])
+    raise TypeError(f'Unsupported hyperparameter "{name}" of type {type(variable).__name__}')
+
+
+_worker_problem: Optional[Union[GeneticProblem, PopulationGeneticProblem]] = None
+
+
+def _init_worker(problem_bytes: bytes) -> None:
+    global _worker_problem
+    _worker_problem = pickle.loads(problem_bytes)
+
+
+def _run_trial(
+    algorithm_type: Union[GeneticAlgorithm, LocalSearch, Algorithm],
+    params: Dict[str, Any],
+    problem: Optional[Union[GeneticProblem, PopulationGeneticProblem]] = None,
+) -> float:
+    algorithm = deepcopy(algorithm_type)
+    set_params(algorithm, hierarchical(params))
+    res = minimize(problem or _worker_problem, algorithm, termination=("n_evals", TRIAL_EVALUATIONS), seed=SEED)
+    return float(res.F[0])
 
 
 def hyperparameter_optimize(
-    algorithm_type: Union[GeneticAlgorithm, LocalSearch, Algorithm], problem: GeneticProblem
-) -> Result:
-    return minimize(
-        HyperparameterProblem(
-            algorithm_type, SingleObjectiveSingleRun(problem, termination=("n_evals", 500), seed=SEED)
-        ),
-        Optuna(),
-        termination=("n_evals", 50),
-        seed=1,
-        verbose=False,
+    algorithm_type: Union[GeneticAlgorithm, LocalSearch, Algorithm],
+    problem: Union[GeneticProblem, PopulationGeneticProblem],
+    storage: Optional[str] = None,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """Tunes the hyperparameters of `algorithm_type` on `problem` and returns the best (flattened) parameters.
+
+    With a `storage` (an Optuna storage URL, e.g. "sqlite:///hyperparameters.db") the study is named after the
+    algorithm and the problem fingerprint: finished studies are reused as they are and unfinished ones continue from
+    their stored trials. Trials are evaluated `workers` at a time in separate processes.
+    """
+    if workers < 1:
+        raise ValueError(f'Invalid hyperparameter workers "{workers}". It must be at least 1')
+    # Optuna is only imported by runs that actually tune
+    import optuna
+    from optuna.samplers import TPESampler
+    from optuna.trial import TrialState
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    variables = flatten(get_params(algorithm_type))
+    study = optuna.create_study(
+        study_name=f"{type(algorithm_type).__name__}-{problem_fingerprint(problem)}",
+        storage=storage,
+        sampler=TPESampler(seed=1, constant_liar=workers > 1),
+        direction="minimize",
+        load_if_exists=True,
+    )
+    remaining = N_TRIALS - len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,)))
+    executor = (
+        # the problem travels pickled, so that it never carries a process pool of its own into the workers
+        ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(pickle.dumps(problem),))
+        if workers > 1
+        else None
     )
+    try:
+        while remaining > 0:
+            trials = [study.ask() for _ in range(min(workers, remaining))]
+            batch = [
+                {name: _suggest(trial, name, variable) for name, variable in variables.items()} for trial in trials
+            ]
+            if executor is None:
+                values = [_run_trial(algorithm_type, params, problem) for params in batch]
+            else:
+                values = executor.map(_run_trial, [algorithm_type] * len(batch), batch)
+            for trial, value in zip(trials, values):
+                study.tell(trial, value)
+            remaining -= len(trials)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return study.best_params
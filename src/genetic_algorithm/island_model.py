@@ -0,0 +1,245 @@
+import multiprocessing
+import pickle
+import time
+from copy import deepcopy
+from multiprocessing.connection import Connection
+from traceback import format_exc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from pymoo.algorithms.soo.nonconvex.ga import FitnessSurvival
+from pymoo.core.algorithm import Algorithm
+from pymoo.core.callback import Callback
+from pymoo.core.individual import Individual
+from pymoo.core.population import Population
+from pymoo.core.problem import Problem
+from pymoo.core.result import Result
+from pymoo.core.termination import Termination
+
+from genetic_algorithm.termination import stop_reason
+
+# (n_islands, epoch, rng) -> list of (source island, target island)
+Topology = Callable[[int, int, np.random.Generator], List[Tuple[int, int]]]
+
+
+def ring(n_islands: int, epoch: int, rng: np.random.Generator) -> List[Tuple[int, int]]:
+    return [(i, (i + 1) % n_islands) for i in range(n_islands)]
+
+
+def fully_connected(n_islands: int, epoch: int, rng: np.random.Generator) -> List[Tuple[int, int]]:
+    return [(i, j) for i in range(n_islands) for j in range(n_islands) if i != j]
+
+
+def random_pairs(n_islands: int, epoch: int, rng: np.random.Generator) -> List[Tuple[int, int]]:
+    """Every island sends to one other island, drawn anew at every migration."""
+    targets = rng.permutation(n_islands)
+    while n_islands > 1 and np.any(targets == np.arange(n_islands)):
+        targets = rng.permutation(n_islands)
+    return [(i, int(j)) for i, j in enumerate(targets) if i != j]
+
+
+topology_map: Dict[str, Topology] = {"ring": ring, "fully_connected": fully_connected, "random": random_pairs}
+
+
+class IslandError(RuntimeError):
+    pass
+
+
+class IslandStats(NamedTuple):
+    island: int
+    seed: int
+    best_f: float
+    n_gen: int
+    n_eval: int
+    immigrants_accepted: int
+    history: List[float]
+    stop_reason: str
+
+
+def _best(pop: Population, n: int) -> List[Individual]:
+    return list(pop[np.argsort(pop.get("F")[:, 0], kind="stable")[:n]])
+
+
+def _immigrate(algorithm: Algorithm, immigrants: List[Individual]) -> int:
+    """Replaces the worst individuals by better immigrants; returns the number of accepted immigrants.
+
+    Only for algorithms whose whole state is their population (see `AlgorithmSpec.migratable`): the population is then
+    passed through the algorithm's survival again, so that ranks, elites and the optimum account for the immigrants.
+    """
+    pop = algorithm.pop
+    accepted = 0
+    for immigrant in sorted(immigrants, key=lambda individual: individual.F[0]):
+        worst = int(np.argmax(pop.get("F")[:, 0]))
+        if immigrant.F[0] >= pop[worst].F[0]:
+            break
+        pop[worst] = immigrant.copy()
+        accepted += 1
+    if accepted:
+        survival = getattr(algorithm, "survival", None) or FitnessSurvival()
+        algorithm.pop = survival.do(algorithm.problem, pop, n_survive=len(pop), algorithm=algorithm)
+        algorithm._set_optimum()
+    return accepted
+
+
+def _island(
+    connection: Connection,
+    problem_bytes: bytes,
+    algorithm: Algorithm,
+    termination: Termination,
+    seed: int,
+    n_migrants: int,
+    callback: Optional[Callback] = None,
+) -> None:
+    """Runs one island; the main process sends ("advance", n_gen), ("immigrate", individuals) or ("stop", None).
+
+    A failing island replies with an IslandError carrying its traceback, which the main process raises.
+    """
+    try:
+        options = {} if callback is None else {"callback": callback}
+        algorithm.setup(pickle.loads(problem_bytes), termination=termination, seed=seed, verbose=False, **options)
+        accepted = 0
+        history = []
+        while True:
+            command, argument = connection.recv()
+            if command == "advance":
+                for _ in range(argument):
+                    if not algorithm.has_next():
+                        break
+                    algorithm.next()
+                history.append(float(algorithm.opt[0].F[0]))
+                connection.send((_best(algorithm.pop, n_migrants), algorithm.has_next(), history[-1]))
+            elif command == "immigrate":
+                accepted += _immigrate(algorithm, argument)
+                connection.send(None)
+            else:
+                opt = algorithm.opt[0]
+                # pymoo counts the generation about to run, one past the last one that ran
+                n_gen = 0 if algorithm.n_gen is None else algorithm.n_gen - 1
+                connection.send(
+                    (
+                        opt.X,
+                        opt.F,
+                        int(n_gen),
+                        int(algorithm.evaluator.n_eval),
+                        accepted,
+                        history,
+                        stop_reason(algorithm.termination),
+                    )
+                )
+                return
+    except EOFError:
+        # the main process has gone away
+        return
+    except Exception:
+        connection.send(IslandError(f"Island with seed {seed} failed:\n{format_exc()}"))
+
+
+def _receive(connection: Connection, island: int) -> Any:
+    try:
+        reply = connection.recv()
+    except EOFError:
+        raise IslandError(f"Island {island} exited without replying") from None
+    if isinstance(reply, IslandError):
+        raise reply
+    return reply
+
+
+class IslandModel:
+    """Runs `n_islands` copies of an algorithm in separate processes, each with its own seed.
+
+    Every `migration_interval` generations the best `n_migrants` individuals of every island are sent along the
+    edges of the `topology`, where they replace the worst individuals they improve on.
+    """
+
+    def __init__(
+        self,
+        algorithm: Algorithm,
+        n_islands: int,
+        migration_interval: int,
+        n_migrants: int,
+        topology: str = "ring",
+    ) -> None:
+        self.algorithm = algorithm
+        self.n_islands = n_islands
+        self.migration_interval = migration_interval
+        self.n_migrants = n_migrants
+        self.topology = topology_map[topology]
+
+    def run(
+        self,
+        problem: Problem,
+        termination: Termination,
+        seed: int,
+        verbose: bool = False,
+        callback: Optional[Callback] = None,
+    ) -> Result:
+        start = time.time()
+        problem_bytes = pickle.dumps(problem)
+        seeds = [seed + island for island in range(self.n_islands)]
+        connections, processes = [], []
+        for island_seed in seeds:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_island,
+                args=(
+                    child,
+                    problem_bytes,
+                    deepcopy(self.algorithm),
+                    deepcopy(termination),
+                    island_seed,
+                    self.n_migrants,
+                    deepcopy(callback),
+                ),
+            )
+            process.start()
+            # only the island holds its end, so that a dead island surfaces as EOFError instead of a hanging recv
+            child.close()
+            connections.append(parent)
+            processes.append(process)
+
+        rng = np.random.default_rng(seed)
+        try:
+            epoch, running = 0, True
+            while running:
+                for connection in connections:
+                    connection.send(("advance", self.migration_interval))
+                replies = [_receive(connection, island) for island, connection in enumerate(connections)]
+                running = any(has_next for _, has_next, _ in replies)
+                if verbose:
+                    best = min(best_f for _, _, best_f in replies)
+                    print(f"Epoch {epoch:>4} | best f: {best:.6E}")
+                immigrants: List[List[Any]] = [[] for _ in connections]
+                for source, target in self.topology(self.n_islands, epoch, rng):
+                    immigrants[target].extend(replies[source][0])
+                for connection, individuals in zip(connections, immigrants):
+                    connection.send(("immigrate", individuals))
+                for island, connection in enumerate(connections):
+                    _receive(connection, island)
+                epoch += 1
+            for connection in connections:
+                connection.send(("stop", None))
+            finals = [_receive(connection, island) for island, connection in enumerate(connections)]
+        except BaseException:
+            for process in processes:
+                process.terminate()
+            raise
+        finally:
+            for connection in connections:
+                connection.close()
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+        res = Result()
+        res.islands = [
+            IslandStats(island, island_seed, float(F[0]), n_gen, n_eval, accepted, history, reason)
+            for island, (island_seed, (_, F, n_gen, n_eval, accepted, history, reason)) in enumerate(zip(seeds, finals))
+        ]
+        best = int(np.argmin([stats.best_f for stats in res.islands]))
+        res.X, res.F = finals[best][0], finals[best][1]
+        res.stop_reason = res.islands[best].stop_reason
+        res.problem = problem
+        res.start_time, res.end_time = start, time.time()
+        res.exec_time = res.end_time - start
+        return res
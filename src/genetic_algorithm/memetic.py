@@ -0,0 +1,51 @@
+import numpy as np
+from pymoo.core.algorithm import Algorithm
+from pymoo.core.callback import Callback
+from pymoo.core.population import Population
+from scipy.optimize import minimize
+
+
+class MemeticRefinement(Callback):
+    """Every `interval` generations refines the `top_k` best individuals with bounded L-BFGS-B.
+
+    The refinement follows the analytic gradient of the classic objective of `algorithm.problem.objective`; refined
+    points are evaluated by the problem itself and replace their originals when they improve on them. The objective
+    evaluations of L-BFGS-B count towards `algorithm.evaluator.n_eval`, so evaluation budgets include them.
+    """
+
+    def __init__(self, interval: int, top_k: int = 5, maxiter: int = 20) -> None:
+        super().__init__()
+        self.interval = interval
+        self.top_k = top_k
+        self.maxiter = maxiter
+        self.data["refined"] = 0
+
+    def notify(self, algorithm: Algorithm) -> None:
+        if algorithm.n_gen % self.interval != 0 or algorithm.pop is None:
+            return
+        problem, pop = algorithm.problem, algorithm.pop
+        top = np.argsort(pop.get("F")[:, 0], kind="stable")[: self.top_k]
+        results = [
+            minimize(
+                problem.objective.value_and_gradient,
+                pop[i].X,
+                jac=True,
+                method="L-BFGS-B",
+                bounds=np.column_stack([problem.xl, problem.xu]),
+                options={"maxiter": self.maxiter},
+            )
+            for i in top
+        ]
+        algorithm.evaluator.n_eval += sum(res.nfev for res in results)
+        refined = Population.new(X=np.array([res.x for res in results]))
+        algorithm.evaluator.eval(problem, refined)
+        improved = 0
+        for i, individual in zip(top, refined):
+            if individual.F[0] < pop[i].F[0]:
+                # keep the algorithm's bookkeeping (ranks, crowding, ...) attached to the replaced individual
+                individual.data = {**pop[i].data, **individual.data}
+                pop[i] = individual
+                improved += 1
+        if improved:
+            algorithm._set_optimum()
+        self.data["refined"] += improved
@@ -0,0 +1,146 @@
+import multiprocessing
+import pickle
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from genetic_algorithm.genetic_problem import PopulationGeneticProblem, classic_population_fitness
+from instrumentation import instrumentation
+from objective.objective import Objective, PopulationFitness
+from spectrum.experimental_spectrum import ExperimentalSpectrum
+
+SHARED_ATTRIBUTES = ("broadened_vals", "broadened_gram", "broadened_dot_vals")
+# a candidate compressed for the "lowrank" engine is only evaluated through its basis
+LOW_RANK_SHARED_ATTRIBUTES = ("low_rank_coefficients", "low_rank_dot_vals")
+
+# (candidate index, attribute) -> (shared memory name, shape, dtype)
+SharedHandles = Dict[Tuple[int, str], Tuple[str, Tuple[int, ...], str]]
+
+
+def shared_attributes(candidate: ExperimentalSpectrum) -> Tuple[str, ...]:
+    return SHARED_ATTRIBUTES if candidate.low_rank is None else LOW_RANK_SHARED_ATTRIBUTES
+
+
+class SharedSpectra:
+    """Moves the broadened matrices of every candidate into shared memory blocks, once per run.
+
+    The candidates are rebound to views of the blocks, so the parent keeps working on the same data the workers see.
+    `close` restores private copies and releases the blocks.
+    """
+
+    def __init__(self, objective: Objective) -> None:
+        self.objective = objective
+        self.blocks: List[SharedMemory] = []
+        self.handles: SharedHandles = {}
+        for i, candidate in enumerate(objective.candidates):
+            for attribute in shared_attributes(candidate):
+                array = np.ascontiguousarray(getattr(candidate, attribute))
+                block = SharedMemory(create=True, size=max(1, array.nbytes))
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+                view[...] = array
+                setattr(candidate, attribute, view)
+                self.blocks.append(block)
+                self.handles[(i, attribute)] = (block.name, array.shape, array.dtype.str)
+
+    @contextmanager
+    def detached(self) -> Iterator[Objective]:
+        """The objective without its shared matrices and broadened spectra, for shipping to the workers."""
+        # the instance dictionaries are restored as they were, so that a Gram matrix not computed yet stays lazy
+        saved = [vars(candidate).copy() for candidate in self.objective.candidates]
+        try:
+            for candidate in self.objective.candidates:
+                for attribute in dict.fromkeys((*SHARED_ATTRIBUTES, *shared_attributes(candidate), "broadened")):
+                    setattr(candidate, attribute, None)
+            yield self.objective
+        finally:
+            for candidate, state in zip(self.objective.candidates, saved):
+                vars(candidate).clear()
+                vars(candidate).update(state)
+
+    def close(self) -> None:
+        for i, attribute in self.handles:
+            candidate = self.objective.candidates[i]
+            setattr(candidate, attribute, np.array(getattr(candidate, attribute)))
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+_worker_state: Dict[str, object] = {}
+
+
+def _init_worker(objective_bytes: bytes, population_fitness: PopulationFitness, handles: SharedHandles) -> None:
+    objective = pickle.loads(objective_bytes)
+    blocks = []
+    for (i, attribute), (name, shape, dtype) in handles.items():
+        # workers share the parent's resource tracker, which releases the blocks once the parent unlinks them
+        block = SharedMemory(name=name)
+        setattr(objective.candidates[i], attribute, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf))
+        blocks.append(block)
+    _worker_state.update(objective=objective, population_fitness=population_fitness, blocks=blocks)
+
+
+def _evaluate_tile(x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    return _worker_state["objective"].process_population(x, _worker_state["population_fitness"])
+
+
+class ParallelPopulationProblem(PopulationGeneticProblem):
+    """Distributes the population tiles over a persistent pool of `workers` processes.
+
+    Tiles are cut exactly as in the serial PopulationGeneticProblem and the dropout draws are keyed by individual, so
+    the objective values are bit-identical to a serial evaluation with the same `tile_size`.
+    """
+
+    def __init__(
+        self,
+        objective: Objective,
+        population_fitness: PopulationFitness = classic_population_fitness,
+        memory_budget: Optional[int] = None,
+        tile_size: Optional[int] = None,
+        workers: Optional[int] = None,
+    ) -> None:
+        super().__init__(objective, population_fitness, memory_budget, tile_size)
+        self.workers = workers or multiprocessing.cpu_count()
+        self.shared = SharedSpectra(objective)
+        with self.shared.detached() as detached:
+            objective_bytes = pickle.dumps(detached)
+        self.pool = multiprocessing.Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(objective_bytes, population_fitness, self.shared.handles),
+        )
+
+    def _evaluate(self, x: npt.NDArray[np.float64], out: dict, *args, **kwargs) -> None:
+        if self.pool is None:
+            return super()._evaluate(x, out, *args, **kwargs)
+        with instrumentation.stage("evaluation", len(x)):
+            out["F"] = np.concatenate(self.pool.map(_evaluate_tile, self._tiles(x), chunksize=1))
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            self.shared.close()
+
+    def __enter__(self) -> "ParallelPopulationProblem":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __getstate__(self) -> dict:
+        # copies of the problem (e.g. inside pymoo results) evaluate serially
+        state = self.__dict__.copy()
+        state["pool"] = state["shared"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+
+    def __del__(self) -> None:
+        self.close()
@@ -0,0 +1,105 @@
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+from pymoo.core.algorithm import Algorithm
+from pymoo.core.termination import MultipleCriteria, TerminateIfAll, TerminateIfAny, Termination
+from pymoo.termination.max_eval import MaximumFunctionCallTermination
+from pymoo.termination.max_gen import MaximumGenerationTermination
+from pymoo.termination.max_time import TimeBasedTermination
+
+
+class FitnessPlateauTermination(Termination):
+    """Stops once the best fitness improved by less than `tol` over the last `window` generations."""
+
+    def __init__(self, window: int = 50, tol: float = 1e-6) -> None:
+        super().__init__()
+        self.window = window
+        self.tol = tol
+        self.history = deque(maxlen=window + 1)
+
+    def _update(self, algorithm: Algorithm) -> float:
+        if algorithm.opt is None:
+            return 0.0
+        self.history.append(float(algorithm.opt.get("F")[:, 0].min()))
+        if self.history[0] - self.history[-1] >= self.tol:
+            return 0.0
+        return (len(self.history) - 1) / self.window
+
+
+class DiversityTermination(Termination):
+    """Stops once the mean spread of the population, relative to the bounds of every variable, drops below `tol`.
+
+    Variables with equal bounds cannot spread and are left out of the mean.
+    """
+
+    def __init__(self, tol: float = 1e-4) -> None:
+        super().__init__()
+        self.tol = tol
+
+    def _update(self, algorithm: Algorithm) -> float:
+        if algorithm.pop is None or len(algorithm.pop) < 2:
+            return 0.0
+        width = algorithm.problem.xu - algorithm.problem.xl
+        if not (free := width > 0).any():
+            return np.inf
+        spread = np.mean(np.std(algorithm.pop.get("X")[:, free], axis=0) / width[free])
+        return np.inf if spread == 0 else self.tol / spread
+
+
+termination_map: Dict[str, Callable[..., Termination]] = {
+    "n_gen": MaximumGenerationTermination,
+    "n_eval": MaximumFunctionCallTermination,
+    "time": TimeBasedTermination,
+    "plateau": FitnessPlateauTermination,
+    "diversity": DiversityTermination,
+}
+
+reason_map: Dict[type, Callable[[Any], str]] = {
+    MaximumGenerationTermination: lambda t: f"generation budget ({t.n_max_gen:g} generations)",
+    MaximumFunctionCallTermination: lambda t: f"evaluation budget ({t.n_max_evals:g} evaluations)",
+    TimeBasedTermination: lambda t: f"wall-clock budget ({t.max_time:g} seconds)",
+    FitnessPlateauTermination: lambda t: f"fitness plateau (improved by less than {t.tol:g} in {t.window} generations)",
+    DiversityTermination: lambda t: f"diversity collapse (mean spread below {t.tol:g})",
+}
+
+
+def build_termination(spec: Dict[str, Any]) -> Termination:
+    """Builds the termination described in the analysis file.
+
+    `{"any": [...]}` and `{"all": [...]}` combine the listed terminations with OR and AND; any other key names a
+    criterion of `termination_map` with its parameters, given as a mapping or a single value. Several criteria in
+    one mapping stop the run when any of them is met.
+    """
+    if set(spec) == {"any"}:
+        return TerminateIfAny(*(build_termination(s) for s in spec["any"]))
+    if set(spec) == {"all"}:
+        return TerminateIfAll(*(build_termination(s) for s in spec["all"]))
+    criteria = []
+    for name, parameters in spec.items():
+        if name not in termination_map:
+            raise KeyError(f'Invalid termination "{name}". Valid options are: {["any", "all", *termination_map]}')
+        criteria.append(
+            termination_map[name](**parameters) if isinstance(parameters, dict) else termination_map[name](parameters)
+        )
+    return criteria[0] if len(criteria) == 1 else TerminateIfAny(*criteria)
+
+
+def _nested_reason(termination: Termination) -> str:
+    reason = stop_reason(termination)
+    return f"({reason})" if isinstance(termination, MultipleCriteria) else reason
+
+
+def stop_reason(termination: Optional[Termination]) -> str:
+    """Which criteria of a finished run's termination were met."""
+    if termination is None or not termination.has_terminated():
+        return "not terminated"
+    if termination.force_termination:
+        return "stopped by the algorithm"
+    if isinstance(termination, TerminateIfAll):
+        return " and ".join(_nested_reason(criterion) for criterion in termination.criteria)
+    if isinstance(termination, TerminateIfAny):
+        return " or ".join(
+            _nested_reason(criterion) for criterion in termination.criteria if criterion.has_terminated()
+        )
+    return reason_map[type(termination)](termination)
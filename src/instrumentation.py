@@ -0,0 +1,142 @@
+"""Stage-level timing, call counts, GA throughput and peak memory of a run.
+
+Enabled by the GA_INSTRUMENTATION environment variable or the "instrument" argument of `main.py`; the report is
+written as `instrumentation.json` to the analysis directory. Two reports are compared with
+`python instrumentation.py <before.json> <after.json>`.
+"""
+
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from pymoo.core.algorithm import Algorithm
+from pymoo.core.callback import Callback
+
+ENVIRONMENT_VARIABLE = "GA_INSTRUMENTATION"
+REPORT_FILE = "instrumentation.json"
+
+_disabled = nullcontext()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident memory of this process and its finished children (Linux reports kilobytes)."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+class Instrumentation:
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self) -> None:
+        self.start = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.generations: List[Dict[str, float]] = []
+
+    def _record(self, name: str, seconds: float, items: int) -> None:
+        stats = self.stages.setdefault(name, {"calls": 0, "items": 0, "wall_time": 0.0, "peak_rss_mb": 0.0})
+        stats["calls"] += 1
+        stats["items"] += items
+        stats["wall_time"] += seconds
+        stats["peak_rss_mb"] = peak_rss_mb()
+
+    @contextmanager
+    def _stage(self, name: str, items: int) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter() - start, items)
+
+    def stage(self, name: str, items: int = 1):
+        """Times the enclosed block as one call of stage `name` covering `items` units of work."""
+        return self._stage(name, items) if self.enabled else _disabled
+
+    def iterate(self, name: str, iterable: Iterable) -> Iterable:
+        """Times the production of every element of a (lazy) iterable as one call of stage `name`."""
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iter(iterable))
+
+    def _iterate(self, name: str, iterator: Iterator) -> Iterator:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self._record(name, time.perf_counter() - start, 1)
+            yield item
+
+    def generation(self, n_gen: int, evaluations: int, seconds: float) -> None:
+        self.generations.append(
+            {
+                "n_gen": n_gen,
+                "evaluations": evaluations,
+                "seconds": seconds,
+                "evaluations_per_second": evaluations / seconds if seconds > 0 else 0.0,
+            }
+        )
+
+    def report(self) -> Dict[str, Any]:
+        evaluations = sum(g["evaluations"] for g in self.generations)
+        seconds = sum(g["seconds"] for g in self.generations)
+        return {
+            "wall_time": time.perf_counter() - self.start,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+            "throughput": {
+                "generations": len(self.generations),
+                "evaluations": evaluations,
+                "evaluations_per_second": evaluations / seconds if seconds > 0 else 0.0,
+            },
+            "generations": self.generations,
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=4)
+
+
+instrumentation = Instrumentation(enabled=bool(os.environ.get(ENVIRONMENT_VARIABLE)))
+
+
+class ThroughputCallback(Callback):
+    """Records the evaluations and wall time of every generation, then hands over to the wrapped `callback`."""
+
+    def __init__(self, callback: Optional[Callback] = None) -> None:
+        super().__init__()
+        self.callback = callback
+        self.last_time = time.perf_counter()
+        self.last_eval = 0
+
+    def notify(self, algorithm: Algorithm) -> None:
+        now, n_eval = time.perf_counter(), algorithm.evaluator.n_eval
+        instrumentation.generation(algorithm.n_gen, n_eval - self.last_eval, now - self.last_time)
+        self.last_time, self.last_eval = now, n_eval
+        if self.callback is not None:
+            self.callback(algorithm)
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> None:
+    """Prints the wall time of every stage of two reports side by side."""
+    print(f"{'stage':<40} {'before (s)':>12} {'after (s)':>12} {'ratio':>8}")
+    for name in sorted(set(before["stages"]) | set(after["stages"])):
+        old = before["stages"].get(name, {}).get("wall_time", 0.0)
+        new = after["stages"].get(name, {}).get("wall_time", 0.0)
+        print(f"{name:<40} {old:>12.4f} {new:>12.4f} {new / old if old else float('nan'):>8.3f}")
+    old, new = before["throughput"]["evaluations_per_second"], after["throughput"]["evaluations_per_second"]
+    print(f"{'evaluations per second':<40} {old:>12.1f} {new:>12.1f} {new / old if old else float('nan'):>8.3f}")
+    old, new = before["peak_rss_mb"], after["peak_rss_mb"]
+    print(f"{'peak memory (MB)':<40} {old:>12.1f} {new:>12.1f} {new / old if old else float('nan'):>8.3f}")
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1]) as before, open(sys.argv[2]) as after:
+        compare(json.load(before), json.load(after))
@@ -3,77 +3,204 @@ import env  # isort:skip
 import sys
 from os import getcwd
 from os.path import join
-from typing import Dict, Union
+from types import ModuleType
+from typing import Any, Dict, Optional, Union
 
-from pymoo.termination import get_termination
+from pymoo.core.result import Result
 
 from genetic_algorithm.genetic_algorithm import GeneticAlgorithm
-from genetic_algorithm.genetic_problem import GeneticProblem, classic_fitness
+from genetic_algorithm.genetic_problem import (
+    GeneticProblem,
+    PopulationGeneticProblem,
+    fitness_map,
+    population_fitness_map,
+)
+from genetic_algorithm.parallel_problem import ParallelPopulationProblem
+from instrumentation import REPORT_FILE, ThroughputCallback, instrumentation
 from objective.classic_objective import ClassicObjective
 from objective.clustering_objective import ClusteringObjective
+from objective.objective import Objective
 from overlap.metrics import dendrogram_tanimoto
-from parameters.input_parameters import InputParameters
-from parameters.utils import draw_dendrogram, plot_results, write_dendrogram_data, write_results
+from overlap.weights import boltzmann_weights
+from parameters.input_parameters import InputParameters, precision_dtypes
 
+ANALYSIS_FILE = "GA_Analysis_File.json"
 
-def main() -> int:
-    ip = InputParameters(path=join(getcwd(), "GA_Analysis_File.json"))
-    objectives: Dict[str, Union[ClusteringObjective, ClassicObjective]] = {
+
+def build_objectives(ip: InputParameters) -> Dict[str, Union[ClusteringObjective, ClassicObjective]]:
+    return {
         "clustering": ClusteringObjective(
             ip.energies_array(),
             ip.candidates,
             ip.energy_uncertainty,
             ip.eu,
-            classic_fitness,
+            fitness_map[ip.fitness_engine],
             reference_candidate=ip.reference_candidate,
             cluster_metric=dendrogram_tanimoto,
             cut_point=ip.dendrogram_threshold,
+            cluster_dtype=precision_dtypes[ip.clustering_precision],
         ),
         "classic": ClassicObjective(
             ip.energies_array(),
             ip.candidates,
             ip.energy_uncertainty,
             ip.eu,
-            classic_fitness,
+            fitness_map[ip.fitness_engine],
         ),
     }
 
+
+def build_problem(
+    ip: InputParameters, objective: Objective
+) -> Union[GeneticProblem, PopulationGeneticProblem, ParallelPopulationProblem]:
+    if ip.evaluation_mode == "individual":
+        return GeneticProblem(objective)
+    elif ip.evaluation_workers > 1:
+        return ParallelPopulationProblem(
+            objective,
+            population_fitness=population_fitness_map[ip.fitness_engine],
+            memory_budget=ip.memory_budget,
+            tile_size=ip.evaluation_tile_size,
+            workers=ip.evaluation_workers,
+        )
+    else:
+        return PopulationGeneticProblem(
+            objective,
+            population_fitness=population_fitness_map[ip.fitness_engine],
+            memory_budget=ip.memory_budget,
+            tile_size=ip.evaluation_tile_size,
+        )
+
+
+def hyperparameter_storage(ip: InputParameters, analysis_dir: str) -> Optional[str]:
+    return None if ip.hyperparameter_store is None else f"sqlite:///{join(analysis_dir, ip.hyperparameter_store)}"
+
+
+def optimize(
+    ip: InputParameters,
+    problem: Union[GeneticProblem, PopulationGeneticProblem, ParallelPopulationProblem],
+    analysis_dir: str,
+    ga_type: Optional[str] = None,
+    hyper_params: Optional[Dict[str, Any]] = None,
+) -> Result:
+    try:
+        # validated before the hyperparameters are tuned
+        islands = ip.islands
+        ga = GeneticAlgorithm(
+            ga_type=ga_type or ip.genetic_algorithm,
+            genetic_problem=problem,
+            hyperparameter_storage=hyperparameter_storage(ip, analysis_dir),
+            hyperparameter_workers=ip.hyperparameter_workers,
+            checkpoint_path=None if ip.checkpoint_interval is None else join(analysis_dir, ip.checkpoint_file),
+            checkpoint_interval=ip.checkpoint_interval or 0,
+            resume=ip.resume,
+            hyper_params=hyper_params,
+        )
+        termination = ip.termination
+        callback = None
+        if ip.memetic_interval:
+            # SciPy's optimizers are only imported by memetic runs
+            from genetic_algorithm.memetic import MemeticRefinement
+
+            callback = MemeticRefinement(ip.memetic_interval, ip.memetic_top_k, ip.memetic_maxiter)
+        if islands > 1:
+            return ga.run_islands(
+                termination, islands, ip.migration_interval, ip.migrants, ip.migration_topology, callback=callback
+            )
+        if instrumentation.enabled:
+            callback = ThroughputCallback(callback)
+        with instrumentation.stage("optimization"):
+            return ga.run(termination=termination, **({} if callback is None else {"callback": callback}))
+    finally:
+        if isinstance(problem, ParallelPopulationProblem):
+            problem.close()
+
+
+def plotting(ip: InputParameters) -> ModuleType:
+    """The plotting helpers, imported only by runs that draw or print; headless runs never touch a GUI backend."""
+    if ip.headless:
+        import matplotlib
+
+        matplotlib.use("Agg")
+    from parameters import utils
+
+    return utils
+
+
+def summarize(ip: InputParameters, objective: Objective, res: Result) -> Dict[str, Any]:
+    energies = objective.get_chromosome(res.X)
+    return {
+        "fitness": float(res.F[0]),
+        "energies": dict(zip(ip.energies, energies.tolist())),
+        "boltzmann_weights": dict(zip(ip.energies, boltzmann_weights(energies, ip.eu).tolist())),
+        "runtime": res.exec_time,
+        "stop_reason": res.stop_reason,
+    }
+
+
+def main(analysis_dir: Optional[str] = None) -> Dict[str, Any]:
+    """Runs the analysis in `analysis_dir` (the working directory by default) and returns its summary."""
+    analysis_dir = analysis_dir or getcwd()
+    instrumentation.reset()
+    ip = InputParameters(path=join(analysis_dir, ANALYSIS_FILE))
+    objectives = build_objectives(ip)
+    for candidate in ip.candidates:
+        if candidate.low_rank is not None:
+            print(
+                f"{candidate.type.name} conformers compressed to rank {candidate.low_rank.rank} of"
+                f" {len(candidate.broadened)}: relative reconstruction error {candidate.low_rank.error:.2E}"
+                f" (tolerance {ip.low_rank_tolerance:.2E})."
+            )
+
     if ip.draw_dendrogram:
-        dendro = draw_dendrogram(
-            list(ip.reference_candidate.broadened), objectives["clustering"].linkage, ip.dendrogram_threshold
+        utils = plotting(ip)
+        dendro = utils.draw_dendrogram(
+            ip.reference_candidate.broadened.names, objectives["clustering"].linkage, ip.dendrogram_threshold
         )
-        write_dendrogram_data(dendro, join(getcwd(), "dendrogram_ordering.txt"))
+        utils.write_dendrogram_data(dendro, join(analysis_dir, "dendrogram_ordering.txt"))
 
-    res = GeneticAlgorithm(
-        ga_type=ip.genetic_algorithm,
-        genetic_problem=GeneticProblem(objectives[ip.objective]),
-    ).run(termination=get_termination("n_gen", ip.termination_criterion_ngen))
+    res = optimize(ip, build_problem(ip, objectives[ip.objective]), analysis_dir)
 
-    print(f"Runtime was: {res.exec_time:.2f} seconds.")
+    for island in getattr(res, "islands", []):
+        print(
+            f"Island {island.island} (seed {island.seed}): best f {island.best_f:.6E} after {island.n_gen} generations,"
+            f" {island.n_eval} evaluations, {island.immigrants_accepted} immigrants accepted, stopped by"
+            f" {island.stop_reason}."
+        )
+    print(f"Runtime was: {res.exec_time:.2f} seconds. Stopped by: {res.stop_reason}.")
 
     if not ip.skip_print:
-        write_results(
-            path=getcwd(),
+        utils = plotting(ip)
+        utils.write_results(
+            path=analysis_dir,
             fitness=res.F[0],
             key_energies=ip.energies,
             energies=objectives[ip.objective].get_chromosome(res.X),
             constant=ip.eu,
         )
-        plot_results(
-            path=getcwd(),
+        utils.plot_results(
+            path=analysis_dir,
             experimental_spectra=ip.candidates,
             energies=objectives[ip.objective].get_chromosome(res.X),
             constant=ip.eu,
         )
 
+    if instrumentation.enabled:
+        instrumentation.write(path := join(analysis_dir, REPORT_FILE))
+        print(f"Instrumentation report written at: {path}")
+
+    return summarize(ip, objectives[ip.objective], res)
+
 
 if __name__ == "__main__":
+    if "instrument" in sys.argv[1:]:
+        instrumentation.enabled = True
     try:
         main()
     except Exception as e:
         sys.stderr.write(f"\nResulted error: <{type(e).__name__}> ({e})\n")
 
-        if len(sys.argv) > 1 and sys.argv[1] == "trace":
+        if "trace" in sys.argv[1:]:
             from traceback import format_exc
 
             sys.stderr.write(f"\n{format_exc()}\n")
@@ -3,7 +3,8 @@ from typing import Callable, List
 import numpy as np
 import numpy.typing as npt
 
-from objective.objective import Objective
+from objective.objective import Objective, PopulationFitness
+from overlap.weights import boltzmann_weights_matrix
 from spectrum.experimental_spectrum import ExperimentalSpectrum
 
 
@@ -30,6 +31,10 @@ class ClassicObjective(Objective):
     def upper(self) -> npt.NDArray[np.float64]:
         return self._energies_array + self._error
 
+    @property
+    def candidates(self) -> List[ExperimentalSpectrum]:
+        return self._optimization_candidates
+
     @property
     def n_var(self) -> int:
         return self._energies_array.size
@@ -41,3 +46,11 @@ class ClassicObjective(Objective):
         return -np.prod(
             [self.fitness(self.get_chromosome(x), candidate, self._eu) for candidate in self._optimization_candidates]
         )
+
+    def process_population(
+        self,
+        x: npt.NDArray[np.float64],
+        population_fitness: PopulationFitness,
+    ) -> npt.NDArray[np.float64]:
+        weights = boltzmann_weights_matrix(self.get_chromosome(x), self._eu)
+        return -np.prod([population_fitness(weights, candidate) for candidate in self._optimization_candidates], axis=0)
@@ -0,0 +1,60 @@
+import numpy as np
+import numpy.typing as npt
+from scipy.cluster.hierarchy import leaves_list
+
+
+class ClusterHierarchy:
+    """Flat clusterings of a monotonic linkage at any height, without walking the tree again.
+
+    Every subtree occupies a contiguous run of the dendrogram leaf order, so cutting at `height` only splits that order
+    wherever two neighbouring leaves are joined at or above `height`. Labels follow `cut_tree`: clusters are numbered
+    by their lowest conformer index.
+    """
+
+    def __init__(self, linkage: npt.NDArray[np.float64]) -> None:
+        self.linkage = linkage
+        self.n = len(linkage) + 1
+        self.order = leaves_list(linkage)
+        self.heights = np.sort(linkage[:, 2])
+        self.gaps = self._gap_heights(linkage, self.n)
+
+    @staticmethod
+    def _gap_heights(linkage: npt.NDArray[np.float64], n: int) -> npt.NDArray[np.float64]:
+        """Height of the merge joining leaf order positions i and i + 1."""
+        sizes = np.concatenate([np.ones(n, dtype=np.int64), linkage[:, 3].astype(np.int64)])
+        starts = np.zeros(2 * n - 1, dtype=np.int64)
+        gaps = np.empty(n - 1, dtype=np.float64)
+        for node in range(n - 2, -1, -1):
+            left, right = linkage[node, :2].astype(np.int64)
+            starts[left] = starts[n + node]
+            starts[right] = starts[n + node] + sizes[left]
+            gaps[starts[right] - 1] = linkage[node, 2]
+        return gaps
+
+    @property
+    def thresholds(self) -> npt.NDArray[np.float64]:
+        """Distinct merge heights; the number of clusters changes right above each of them."""
+        return np.unique(self.heights)
+
+    def n_clusters(self, height: float) -> int:
+        return self.n - int(np.searchsorted(self.heights, height, side="left"))
+
+    def _segments(self, height: float) -> npt.NDArray[np.int64]:
+        """Leaf order positions where each cluster starts."""
+        return np.concatenate([[0], np.flatnonzero(self.gaps >= height) + 1])
+
+    def labels(self, height: float) -> npt.NDArray[np.int64]:
+        """Cluster of every conformer when cutting at `height`, identical to `cut_tree(linkage, height=height)`."""
+        segments = self._segments(height)
+        first_members = np.minimum.reduceat(self.order, segments)
+        ranks = np.empty(segments.size, dtype=np.int64)
+        ranks[np.argsort(first_members)] = np.arange(segments.size)
+        labels = np.empty(self.n, dtype=np.int64)
+        labels[self.order] = np.repeat(ranks, np.diff(np.append(segments, self.n)))
+        return labels
+
+    def min_energies(self, energies: npt.NDArray[np.float64], height: float) -> npt.NDArray[np.float64]:
+        """Lowest energy of every cluster at `height`, ordered by cluster label."""
+        segments = self._segments(height)
+        first_members = np.minimum.reduceat(self.order, segments)
+        return np.minimum.reduceat(energies[self.order], segments)[np.argsort(first_members)]
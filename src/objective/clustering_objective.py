@@ -1,10 +1,15 @@
-from typing import Callable, List
+from copy import copy
+from typing import Callable, List, Optional
 
 import numpy as np
 import numpy.typing as npt
-from scipy.cluster.hierarchy import cut_tree, linkage
+from scipy.cluster.hierarchy import linkage
 
-from objective.objective import Objective
+from instrumentation import instrumentation
+from objective.cluster_hierarchy import ClusterHierarchy
+from objective.objective import Objective, PopulationFitness
+from overlap.metrics import condensed_metrics
+from overlap.weights import boltzmann_weights_matrix
 from spectrum.experimental_spectrum import ExperimentalSpectrum
 
 
@@ -19,19 +24,50 @@ class ClusteringObjective(Objective):
         reference_candidate: ExperimentalSpectrum,
         cluster_metric: Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], float],
         cut_point: float,
+        cluster_dtype: npt.DTypeLike = np.float64,
+        hierarchy: Optional[ClusterHierarchy] = None,
     ) -> None:
         self._energies_array = energies_array
         self._optimization_candidates = candidates
         self._error = error
         self._eu = energy_unit
         self.fitness = fitness_function
-        self.linkage = linkage(
-            reference_candidate.broadened_vals, metric=cluster_metric, method="complete", optimal_ordering=False
-        )
-        self.clusters = cut_tree(Z=self.linkage, height=cut_point).reshape(-1)
-        self.chromosome = np.array(
-            [np.min(self._energies_array[self.clusters == cluster]) for cluster in np.sort(np.unique(self.clusters))]
-        )
+        if hierarchy is None:
+            with instrumentation.stage("clustering"):
+                hierarchy = ClusterHierarchy(
+                    linkage(
+                        self._cluster_input(reference_candidate, cluster_metric, cluster_dtype),
+                        metric=cluster_metric,
+                        method="complete",
+                        optimal_ordering=False,
+                    )
+                )
+        self.hierarchy = hierarchy
+        self.linkage = self.hierarchy.linkage
+        self._cut(cut_point)
+
+    def _cut(self, cut_point: float) -> None:
+        self.cut_point = cut_point
+        self.clusters = self.hierarchy.labels(cut_point)
+        self.chromosome = self.hierarchy.min_energies(self._energies_array, cut_point)
+
+    def with_cut_point(self, cut_point: float) -> "ClusteringObjective":
+        """The same objective cut at another dendrogram threshold, reusing the linkage."""
+        objective = copy(self)
+        objective._cut(cut_point)
+        return objective
+
+    @staticmethod
+    def _cluster_input(
+        reference_candidate: ExperimentalSpectrum,
+        cluster_metric: Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], float],
+        cluster_dtype: npt.DTypeLike,
+    ) -> npt.NDArray[np.float64]:
+        """Precomputed condensed distances for metrics with a vectorized form, the raw spectra for any other metric."""
+        if (condensed := condensed_metrics.get(cluster_metric)) is None:
+            return reference_candidate.broadened_vals
+        gram = reference_candidate.broadened_gram if reference_candidate.broadened_gram.dtype == cluster_dtype else None
+        return condensed(reference_candidate.broadened_vals, gram=gram, dtype=cluster_dtype)
 
     @property
     def lower(self) -> npt.NDArray[np.float64]:
@@ -41,14 +77,29 @@ class ClusteringObjective(Objective):
     def upper(self) -> npt.NDArray[np.float64]:
         return self.chromosome + self._error
 
+    @property
+    def candidates(self) -> List[ExperimentalSpectrum]:
+        return self._optimization_candidates
+
     @property
     def n_var(self) -> int:
         return self.chromosome.size
 
     def get_chromosome(self, x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
-        return x[self.clusters]
+        return x[..., self.clusters]
+
+    def chromosome_gradient(self, energies_gradient: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return np.bincount(self.clusters, weights=energies_gradient, minlength=self.chromosome.size)
 
     def process(self, x: npt.NDArray[np.float64]) -> np.float64:
         return -np.prod(
             [self.fitness(self.get_chromosome(x), candidate, self._eu) for candidate in self._optimization_candidates]
         )
+
+    def process_population(
+        self,
+        x: npt.NDArray[np.float64],
+        population_fitness: PopulationFitness,
+    ) -> npt.NDArray[np.float64]:
+        weights = boltzmann_weights_matrix(self.get_chromosome(x), self._eu)
+        return -np.prod([population_fitness(weights, candidate) for candidate in self._optimization_candidates], axis=0)
@@ -1,17 +1,65 @@
 from abc import ABC, abstractmethod
+from copy import copy
+from typing import Callable, List, Tuple
 
 import numpy as np
 import numpy.typing as npt
 
+from overlap.metrics import gram_tanimoto_gradient
+from overlap.weights import boltzmann_weights_matrix, boltzmann_weights_vjp
+from spectrum.experimental_spectrum import ExperimentalSpectrum
+
+PopulationFitness = Callable[[npt.NDArray[np.float64], ExperimentalSpectrum], npt.NDArray[np.float64]]
+
 
 class Objective(ABC):
     def __call__(self, x: npt.NDArray[np.float64]) -> np.float64:
         return self.process(x)
 
+    def with_energy_uncertainty(self, error: float) -> "Objective":
+        """The same objective searching `error` around each energy; the spectra and clusters are shared."""
+        objective = copy(self)
+        objective._error = error
+        return objective
+
+    def with_candidates(self, candidates: List[ExperimentalSpectrum]) -> "Objective":
+        """The same objective fitted against other `candidates`, e.g. the same spectra in another precision."""
+        objective = copy(self)
+        objective._optimization_candidates = candidates
+        return objective
+
+    def chromosome_gradient(self, energies_gradient: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        """Maps a gradient with respect to the conformer energies back onto the chromosome."""
+        return energies_gradient
+
+    def value_and_gradient(self, x: npt.NDArray[np.float64]) -> Tuple[float, npt.NDArray[np.float64]]:
+        """The classic (Gram) objective of a single chromosome together with its analytic gradient."""
+        weights = boltzmann_weights_matrix(self.get_chromosome(x)[None, :], self._eu)[0]
+        similarities, gradients = zip(
+            *(
+                gram_tanimoto_gradient(weights, c.broadened_gram, c.broadened_dot_vals, c.vals_dot_vals)
+                for c in self.candidates
+            )
+        )
+        fitnesses = 1 + np.array(similarities)
+        # d(-prod f_k) = -sum_k (prod_{l != k} f_l) df_k
+        others = np.array([np.prod(np.delete(fitnesses, k)) for k in range(fitnesses.size)])
+        weights_gradient = -np.tensordot(others, np.array(gradients), axes=1)
+        energies_gradient = boltzmann_weights_vjp(weights, weights_gradient, self._eu)
+        return -np.prod(fitnesses), self.chromosome_gradient(energies_gradient)
+
     @abstractmethod
     def process(self, x: npt.NDArray[np.float64]) -> np.float64:
         raise NotImplementedError()
 
+    @abstractmethod
+    def process_population(
+        self,
+        x: npt.NDArray[np.float64],
+        population_fitness: PopulationFitness,
+    ) -> npt.NDArray[np.float64]:
+        raise NotImplementedError()
+
     @property
     @abstractmethod
     def lower(self) -> npt.NDArray[np.float64]:
@@ -26,6 +74,11 @@ class Objective(ABC):
     def get_chromosome(self, x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
         raise NotImplementedError()
 
+    @property
+    @abstractmethod
+    def candidates(self) -> List[ExperimentalSpectrum]:
+        raise NotImplementedError()
+
     @property
     @abstractmethod
     def n_var(self) -> int:
@@ -1,11 +1,56 @@
+from typing import Optional, Tuple
+
 import numpy as np
 import numpy.typing as npt
 
+BLOCK_ELEMENTS = 2**22
+
 
 def tanimoto(f1: npt.NDArray[np.float64], f2: npt.NDArray[np.float64]) -> float:
     return (f1_dot_f2 := f1 @ f2) / ((f1 @ f1) + (f2 @ f2) - np.abs(f1_dot_f2))
 
 
+def gram_tanimoto(
+    weights: npt.NDArray[np.float64],
+    gram: npt.NDArray[np.float64],
+    projection: npt.NDArray[np.float64],
+    f2_dot_f2: float,
+) -> npt.NDArray[np.float64]:
+    """Tanimoto of `weights @ B` against `f2` from `B @ B.T`, `B @ f2` and `f2 @ f2`; accepts stacked weights."""
+    weights = weights.astype(gram.dtype, copy=False)
+    f1_dot_f2 = weights @ projection
+    f1_dot_f1 = np.einsum("...i,...i->...", weights @ gram, weights)
+    return f1_dot_f2 / (f1_dot_f1 + f2_dot_f2 - np.abs(f1_dot_f2))
+
+
+def low_rank_tanimoto(
+    weights: npt.NDArray[np.float64],
+    coefficients: npt.NDArray[np.float64],
+    projection: npt.NDArray[np.float64],
+    f2_dot_f2: float,
+) -> npt.NDArray[np.float64]:
+    """Tanimoto of `weights @ C @ V` against `f2` from the basis coefficients C, `V @ f2` and `f2 @ f2`."""
+    f1 = weights.astype(coefficients.dtype, copy=False) @ coefficients
+    f1_dot_f2 = f1 @ projection
+    f1_dot_f1 = np.einsum("...i,...i->...", f1, f1)
+    return f1_dot_f2 / (f1_dot_f1 + f2_dot_f2 - np.abs(f1_dot_f2))
+
+
+def gram_tanimoto_gradient(
+    weights: npt.NDArray[np.float64],
+    gram: npt.NDArray[np.float64],
+    projection: npt.NDArray[np.float64],
+    f2_dot_f2: float,
+) -> Tuple[float, npt.NDArray[np.float64]]:
+    """`gram_tanimoto` of a single weight vector together with its gradient with respect to the weights."""
+    f1_dot_f2 = weights @ projection
+    gram_weights = gram @ weights
+    denominator = weights @ gram_weights + f2_dot_f2 - np.abs(f1_dot_f2)
+    similarity = f1_dot_f2 / denominator
+    gradient = (projection * (1 + similarity * np.sign(f1_dot_f2)) - 2 * similarity * gram_weights) / denominator
+    return similarity, gradient
+
+
 def fitness_tanimoto(f1: npt.NDArray[np.float64], f2: npt.NDArray[np.float64]) -> float:
     """This version only yields values in the interval [0, 2]; where 0 is a complete mirroring."""
     return 1 + tanimoto(f1, f2)
@@ -18,3 +63,40 @@ def dendrogram_tanimoto(f1: npt.NDArray[np.float64], f2: npt.NDArray[np.float64]
 
 def euclidean(f1: npt.NDArray[np.float64], f2: npt.NDArray[np.float64]) -> float:
     return np.linalg.norm(f1 - f2)
+
+
+def tanimoto_rows(f1: npt.NDArray[np.float64], f2: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Tanimoto similarity of every row of `f1` against the single spectrum `f2`."""
+    f1_dot_f2 = f1 @ f2
+    return f1_dot_f2 / (np.einsum("ij,ij->i", f1, f1) + (f2 @ f2) - np.abs(f1_dot_f2))
+
+
+def condensed_dendrogram_tanimoto(
+    vectors: npt.NDArray[np.float64],
+    gram: Optional[npt.NDArray[np.float64]] = None,
+    dtype: npt.DTypeLike = np.float64,
+) -> npt.NDArray[np.float64]:
+    """`dendrogram_tanimoto` between every pair of rows of `vectors`, in the condensed order used by scipy.
+
+    Works through blocks of rows of the Gram matrix `vectors @ vectors.T`, which is taken from `gram` when given and
+    otherwise computed a block at a time in `dtype`, so at most about BLOCK_ELEMENTS products are held at once.
+    """
+    n = len(vectors)
+    vectors = vectors.astype(dtype, copy=False)
+    norms = np.einsum("ij,ij->i", vectors, vectors) if gram is None else np.diagonal(gram)
+    distances = np.empty(n * (n - 1) // 2, dtype=np.float64)
+    block_rows = max(1, BLOCK_ELEMENTS // max(1, n))
+    offset = 0
+    for start in range(0, n, block_rows):
+        rows = np.arange(start, min(start + block_rows, n))
+        block = vectors[rows] @ vectors.T if gram is None else gram[rows]
+        # the strict upper triangle of the block, read row by row, is exactly its span of the condensed matrix
+        upper = np.arange(n) > rows[:, None]
+        products = block[upper]
+        norm_sums = (norms[rows, None] + norms)[upper]
+        distances[offset : offset + products.size] = 1 - products / (norm_sums - np.abs(products))
+        offset += products.size
+    return distances
+
+
+condensed_metrics = {dendrogram_tanimoto: condensed_dendrogram_tanimoto}
@@ -20,3 +20,18 @@ def boltzmann_weights(energies: npt.NDArray[np.float64], constant: str) -> npt.N
     energies = rcp_s * rcp_energies
     energies[min_i] = rcp_s
     return energies
+
+
+def boltzmann_weights_matrix(energies: npt.NDArray[np.float64], constant: str) -> npt.NDArray[np.float64]:
+    """Row-wise Boltzmann weights of a (population x conformers) energy matrix, evaluated in log-space."""
+    exponents = (np.min(energies, axis=1, keepdims=True) - energies.astype(np.float64)) * constants[constant]
+    weights = np.exp(exponents)
+    weights /= np.sum(weights, axis=1, keepdims=True)
+    return weights
+
+
+def boltzmann_weights_vjp(
+    weights: npt.NDArray[np.float64], weights_gradient: npt.NDArray[np.float64], constant: str
+) -> npt.NDArray[np.float64]:
+    """Pulls a gradient with respect to the Boltzmann `weights` back to the energies they were computed from."""
+    return -constants[constant] * weights * (weights_gradient - weights_gradient @ weights)
@@ -1,60 +1,126 @@
 import json
-from functools import cached_property
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from copy import copy
+from functools import cached_property, partial
+from itertools import product
 from os.path import dirname, join
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
 import numpy as np
 import numpy.typing as npt
+from pymoo.core.termination import Termination
 
 from genetic_algorithm.genetic_algorithm import ga_map
+from genetic_algorithm.genetic_problem import fitness_map
+from genetic_algorithm.island_model import topology_map
+from genetic_algorithm.termination import build_termination
+from instrumentation import instrumentation
+from spectrum.broadening_cache import BroadeningCache
 from spectrum.experimental_spectrum import ExperimentalSpectrum
-from spectrum.spectrum_type import string_to_spectrum_type
+from spectrum.spectrum_type import broaden_backends, string_to_spectrum_type
+
+SWEEP_SETTINGS = ("energy_uncertainty", "dendrogram_threshold", "objective", "genetic_algorithm")
+OBJECTIVES = ("clustering", "classic")
+
+precision_dtypes: Dict[str, npt.DTypeLike] = {"double": np.float64, "single": np.float32}
 
 
 class InputParameters:
-    def __init__(self, path: str) -> None:
-        with open(path) as f:
-            self.params = json.load(f)
-
-        self.experimental_spectra = [
-            ExperimentalSpectrum.from_path(
-                path=join(dirname(path), spectrum_data["file"]),
-                type=string_to_spectrum_type(spectrum_data["type"]),
-                mirroring_option=spectrum_data["mirroring_option"],
-                path_length=spectrum_data["path_length"],
-                molar_concentration=spectrum_data["molar_concentration"],
-                hwhm=spectrum_data["hwhm"],
-                freq_range=tuple(spectrum_data["interval"]),
-                scaling_factors=spectrum_data["scaling_factors"],
-                is_opt_candidate=spectrum_data["optimise"],
-                is_reference_candidate=spectrum_data["reference_dendrogram"],
-                energies=self.energies,
-                already_broadened=self.already_broadened,
-            )
-            for spectrum_data in self.params["spectra_data"]
-        ]
+    def __init__(self, path: str, overrides: Optional[Dict[str, Any]] = None) -> None:
+        """`overrides` replace settings of the analysis file, e.g. to rerun it in another precision."""
+        with instrumentation.stage("input/parse"), open(path) as f:
+            self.params = {**json.load(f), **(overrides or {})}
+
+        build = partial(self._experimental_spectrum, dirname(path), self.broadening_cache(dirname(path)))
+        if self.broadening_workers > 1:
+            # one thread per spectrum type submits its conformers to the shared process pool, so that the pool
+            # works on (spectrum type x conformer) tasks instead of one spectrum type at a time
+            spectra_data = self.params["spectra_data"]
+            with ProcessPoolExecutor(max_workers=self.broadening_workers) as executor:
+                with ThreadPoolExecutor(max_workers=len(spectra_data)) as submitters:
+                    self.experimental_spectra = list(submitters.map(partial(build, executor=executor), spectra_data))
+        else:
+            self.experimental_spectra = [build(spectrum_data) for spectrum_data in self.params["spectra_data"]]
 
         assert 1 == sum(1 for spectrum in self.experimental_spectra if spectrum.is_reference_candidate)
 
+    def _experimental_spectrum(
+        self,
+        analysis_dir: str,
+        broadening_cache: Optional[BroadeningCache],
+        spectrum_data: Dict,
+        executor: Optional[Executor] = None,
+    ) -> ExperimentalSpectrum:
+        return ExperimentalSpectrum.from_path(
+            path=join(analysis_dir, spectrum_data["file"]),
+            type=string_to_spectrum_type(spectrum_data["type"]),
+            mirroring_option=spectrum_data["mirroring_option"],
+            path_length=spectrum_data["path_length"],
+            molar_concentration=spectrum_data["molar_concentration"],
+            hwhm=spectrum_data["hwhm"],
+            freq_range=tuple(spectrum_data["interval"]),
+            scaling_factors=spectrum_data["scaling_factors"],
+            is_opt_candidate=spectrum_data["optimise"],
+            is_reference_candidate=spectrum_data["reference_dendrogram"],
+            energies=self.energies,
+            already_broadened=self.already_broadened,
+            cutoff_hwhm=spectrum_data.get("cutoff_hwhm"),
+            broadening_backend=self.broadening_backend,
+            broadening_cache=broadening_cache,
+            executor=executor,
+            conformer_store=self.conformer_store,
+            dtype=precision_dtypes[self.precision],
+            low_rank_tolerance=(
+                self.low_rank_tolerance if self.fitness_engine == "lowrank" and spectrum_data["optimise"] else None
+            ),
+        )
+
     @property
     def draw_dendrogram(self) -> float:
         return self.params["draw_dendrogram"]
 
     @property
     def dendrogram_threshold(self) -> float:
-        return self.params["dendrogram_threshold"]
+        if (threshold := self.params["dendrogram_threshold"]) < 0:
+            raise ValueError(f'Invalid dendrogram threshold "{threshold}". It must not be negative')
+        return threshold
+
+    @property
+    def clustering_precision(self) -> str:
+        if (precision := self.params.get("clustering_precision", "double")) in precision_dtypes:
+            return precision
+        else:
+            raise KeyError(f'Invalid clustering precision "{precision}". Valid options are: {list(precision_dtypes)}')
+
+    @property
+    def precision(self) -> str:
+        """Precision of the broadened conformers, the experimental spectra and the fitness evaluation."""
+        if (precision := self.params.get("precision", "double")) in precision_dtypes:
+            return precision
+        else:
+            raise KeyError(f'Invalid precision "{precision}". Valid options are: {list(precision_dtypes)}')
 
     @property
     def termination_criterion_ngen(self) -> float:
         return self.params["termination_criterion(ngen)"]
 
+    @property
+    def termination(self) -> Termination:
+        """The "termination" of the analysis file (see `build_termination`), by default the generation budget."""
+        return build_termination(self.params.get("termination", {"n_gen": self.termination_criterion_ngen}))
+
     @property
     def objective(self) -> str:
-        return self.params["objective"]
+        if (objective := self.params.get("objective")) in OBJECTIVES:
+            return objective
+        else:
+            raise KeyError(f'Invalid objective "{objective}". Valid options are: {list(OBJECTIVES)}')
 
     @property
     def energy_uncertainty(self) -> float:
-        return self.params["energy_uncertainty"]
+        if (error := self.params["energy_uncertainty"]) <= 0:
+            raise ValueError(f'Invalid energy uncertainty "{error}". It must be positive')
+        return error
 
     @property
     def energies(self) -> Dict[str, float]:
@@ -68,6 +134,11 @@ class InputParameters:
     def skip_print(self) -> bool:
         return self.params["skip_print"]
 
+    @property
+    def headless(self) -> bool:
+        """Plots are only saved, on a non-interactive backend."""
+        return self.params.get("headless", False)
+
     @property
     def genetic_algorithm(self) -> str:
         if (ga := self.params.get("genetic_algorithm")) in ga_map:
@@ -75,6 +146,139 @@ class InputParameters:
         else:
             raise KeyError(f'Invalid genetic algorithm "{ga}". Valid options are: {list(ga_map)}')
 
+    @property
+    def evaluation_mode(self) -> str:
+        if (mode := self.params.get("evaluation_mode", "individual")) in ("individual", "population"):
+            return mode
+        else:
+            raise KeyError(f'Invalid evaluation mode "{mode}". Valid options are: ["individual", "population"]')
+
+    @property
+    def fitness_engine(self) -> str:
+        if (engine := self.params.get("fitness_engine", "direct")) in fitness_map:
+            return engine
+        else:
+            raise KeyError(f'Invalid fitness engine "{engine}". Valid options are: {list(fitness_map)}')
+
+    @property
+    def low_rank_tolerance(self) -> float:
+        """Relative reconstruction error allowed to the conformer basis of the "lowrank" fitness engine."""
+        if not 0 <= (tolerance := self.params.get("low_rank_tolerance", 1e-3)) < 1:
+            raise ValueError(f'Invalid low rank tolerance "{tolerance}". It must be within [0, 1)')
+        return tolerance
+
+    @property
+    def memory_budget(self) -> Optional[int]:
+        """Upper bound in bytes for a single population tile, given as "memory_budget_mb" in the analysis file."""
+        if (budget := self.params.get("memory_budget_mb")) is None:
+            return None
+        return int(budget * 1024**2)
+
+    @property
+    def hyperparameter_store(self) -> Optional[str]:
+        """SQLite file, relative to the analysis directory, where tuned hyperparameters are kept between runs."""
+        return self.params.get("hyperparameter_store")
+
+    @property
+    def hyperparameter_workers(self) -> int:
+        if (workers := self.params.get("hyperparameter_workers", 1)) < 1:
+            raise ValueError(f'Invalid hyperparameter workers "{workers}". It must be at least 1')
+        return workers
+
+    @property
+    def islands(self) -> int:
+        islands = self.params.get("islands", 1)
+        if islands > 1 and not ga_map[self.genetic_algorithm].migratable:
+            raise KeyError(
+                f'Invalid genetic algorithm "{self.genetic_algorithm}" for islands. Valid options are:'
+                f" {[ga for ga, spec in ga_map.items() if spec.migratable]}"
+            )
+        return islands
+
+    @property
+    def migration_interval(self) -> int:
+        if (interval := self.params.get("migration_interval", 10)) < 1:
+            raise ValueError(f'Invalid migration interval "{interval}". It must be at least 1')
+        return interval
+
+    @property
+    def migrants(self) -> int:
+        if (migrants := self.params.get("migrants", 2)) < 0:
+            raise ValueError(f'Invalid migrants "{migrants}". It must be at least 0')
+        return migrants
+
+    @property
+    def migration_topology(self) -> str:
+        if (topology := self.params.get("migration_topology", "ring")) in topology_map:
+            return topology
+        else:
+            raise KeyError(f'Invalid migration topology "{topology}". Valid options are: {list(topology_map)}')
+
+    @property
+    def memetic_interval(self) -> Optional[int]:
+        """Generations between two L-BFGS-B refinements of the best individuals; None disables the refinement."""
+        return self.params.get("memetic_interval")
+
+    @property
+    def memetic_top_k(self) -> int:
+        return self.params.get("memetic_top_k", 5)
+
+    @property
+    def memetic_maxiter(self) -> int:
+        return self.params.get("memetic_maxiter", 20)
+
+    @property
+    def checkpoint_interval(self) -> Optional[int]:
+        """Generations between two checkpoints of the running algorithm; None disables checkpointing."""
+        if (interval := self.params.get("checkpoint_interval")) is not None and not ga_map[
+            self.genetic_algorithm
+        ].checkpointable:
+            raise KeyError(
+                f'Invalid genetic algorithm "{self.genetic_algorithm}" for checkpoints. Valid options are:'
+                f" {[ga for ga, spec in ga_map.items() if spec.checkpointable]}"
+            )
+        return interval
+
+    @property
+    def checkpoint_file(self) -> str:
+        return self.params.get("checkpoint_file", "ga_checkpoint.pkl")
+
+    @property
+    def resume(self) -> bool:
+        return self.params.get("resume", False)
+
+    @property
+    def sweep(self) -> List[Dict[str, Any]]:
+        """Sweep points, given as a list of settings or as a grid mapping each setting to its values."""
+        if isinstance(sweep := self.params.get("sweep", []), dict):
+            sweep = [dict(zip(sweep, values)) for values in product(*sweep.values())]
+        for point in sweep:
+            if invalid := set(point) - set(SWEEP_SETTINGS):
+                raise KeyError(f"Invalid sweep settings {sorted(invalid)}. Valid options are: {list(SWEEP_SETTINGS)}")
+            # a point is checked as if it were the analysis file, together with the settings depending on it
+            point_params = copy(self)
+            point_params.params = {**self.params, **point}
+            for setting in (*point, "islands", "checkpoint_interval"):
+                getattr(point_params, setting)
+        return sweep
+
+    @property
+    def sweep_workers(self) -> int:
+        return self.params.get("sweep_workers", 1)
+
+    @property
+    def evaluation_tile_size(self) -> Optional[int]:
+        """Individuals evaluated together by the "population" mode; None evaluates the whole population at once."""
+        if (tile_size := self.params.get("evaluation_tile_size", 64)) is not None and tile_size < 1:
+            raise ValueError(f'Invalid evaluation tile size "{tile_size}". It must be at least 1')
+        return tile_size
+
+    @property
+    def evaluation_workers(self) -> int:
+        if (workers := self.params.get("evaluation_workers", 1)) < 1:
+            raise ValueError(f'Invalid evaluation workers "{workers}". It must be at least 1')
+        return workers
+
     @cached_property
     def candidates(self) -> List[ExperimentalSpectrum]:
         return [spectrum for spectrum in self.experimental_spectra if spectrum.is_opt_candidate]
@@ -83,6 +287,30 @@ class InputParameters:
     def reference_candidate(self) -> ExperimentalSpectrum:
         return next(spectrum for spectrum in self.experimental_spectra if spectrum.is_reference_candidate)
 
+    @property
+    def broadening_backend(self) -> str:
+        if (backend := self.params.get("broadening_backend", "direct")) in broaden_backends:
+            return backend
+        else:
+            raise KeyError(f'Invalid broadening backend "{backend}". Valid options are: {list(broaden_backends)}')
+
+    @property
+    def broadening_cache_mb(self) -> Optional[float]:
+        return self.params.get("broadening_cache_mb")
+
+    def broadening_cache(self, analysis_dir: str) -> Optional[BroadeningCache]:
+        if self.broadening_cache_mb is None:
+            return None
+        return BroadeningCache(join(analysis_dir, ".broadening_cache"), int(self.broadening_cache_mb * 1024**2))
+
+    @property
+    def broadening_workers(self) -> int:
+        return self.params.get("broadening_workers", 1)
+
+    @property
+    def conformer_store(self) -> bool:
+        return self.params.get("conformer_store", False)
+
     @property
     def already_broadened(self) -> bool:
         return self.params["already_broadened"]
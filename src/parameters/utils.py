@@ -41,6 +41,7 @@ def exp_spectrum_plot(path: str, spectrum: ExperimentalSpectrum, energies: List[
     plt.savefig(figpath := join(path, figname := f"{tsi:1.3f}_{spectrum.type.name}_plot.pdf"))
     print(f"{figname} written at: {figpath}")
     plt.show()
+    plt.close()
 
 
 def plot_results(
@@ -54,6 +55,7 @@ def draw_dendrogram(labels: List[str], linkage: Any, cut_point: float) -> Dict[s
     plt.axhline(y=cut_point, c="k", linewidth=0.5)
     dendro = dendrogram(linkage, labels=labels, leaf_rotation=90)
     plt.show()
+    plt.close()
     return dendro
 
 
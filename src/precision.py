@@ -0,0 +1,72 @@
+"""Validates the single precision compute path: `python precision.py [analysis directory] [samples]`.
+
+The analysis is built in double and in single precision. The double precision objective, with its clusters, is then
+evaluated on the same random chromosomes against the spectra of both builds, and the deviation of the single precision
+fitness is reported together with the memory held by the broadened conformers.
+"""
+
+import env  # isort:skip
+
+import sys
+from os import getcwd
+from os.path import join
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from genetic_algorithm.parallel_problem import ParallelPopulationProblem
+from genetic_algorithm.seed import SEED
+from main import ANALYSIS_FILE, build_objectives, build_problem
+from objective.clustering_objective import ClusteringObjective
+from objective.objective import Objective
+from parameters.input_parameters import InputParameters
+from spectrum.experimental_spectrum import ExperimentalSpectrum
+
+DEFAULT_SAMPLES = 256
+
+
+def evaluate(ip: InputParameters, objective: Objective, x: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    problem = build_problem(ip, objective)
+    try:
+        return problem.evaluate(x, return_values_of=["F"])[:, 0].astype(np.float64)
+    finally:
+        if isinstance(problem, ParallelPopulationProblem):
+            problem.close()
+
+
+def matrix_bytes(spectra: List[ExperimentalSpectrum]) -> int:
+    return sum(spectrum.broadened.vals.nbytes for spectrum in spectra)
+
+
+def validate(analysis_dir: Optional[str] = None, samples: int = DEFAULT_SAMPLES) -> Dict[str, Any]:
+    """Deviation of the single from the double precision fitness on `samples` chromosomes within the bounds."""
+    analysis_dir = analysis_dir or getcwd()
+    path = join(analysis_dir, ANALYSIS_FILE)
+    double, single = (InputParameters(path, overrides={"precision": precision}) for precision in ("double", "single"))
+    reference = build_objectives(double)[double.objective]
+    x = np.random.default_rng(SEED).uniform(reference.lower, reference.upper, (samples, reference.n_var))
+    expected = evaluate(double, reference, x)
+    actual = evaluate(single, reference.with_candidates(single.candidates), x)
+    deviation = np.abs(actual - expected)
+    report = {
+        "samples": samples,
+        "max_abs_deviation": float(deviation.max()),
+        "max_rel_deviation": float((deviation / np.maximum(np.abs(expected), np.finfo(np.float64).tiny)).max()),
+        "same_best": bool(np.argmin(actual) == np.argmin(expected)),
+        "double_matrix_mb": matrix_bytes(double.experimental_spectra) / 1024**2,
+        "single_matrix_mb": matrix_bytes(single.experimental_spectra) / 1024**2,
+    }
+    if isinstance(reference, ClusteringObjective):
+        # the clusters themselves are also computed from the single precision spectra in a single precision run
+        clusters = build_objectives(single)["clustering"].clusters
+        report["same_clusters"] = bool(np.array_equal(clusters, reference.clusters))
+    return report
+
+
+if __name__ == "__main__":
+    report = validate(
+        sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SAMPLES
+    )
+    for key, value in report.items():
+        print(f"{key:<20} {value}")
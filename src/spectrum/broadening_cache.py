@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from os.path import join
+from typing import Any, Dict, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+
+class BroadeningCache:
+    """On-disk store of broadened conformer spectra keyed by the raw conformer file and the broadening parameters.
+
+    Every lookup refreshes the entry's modification time, so `evict` drops the least recently used entries first.
+    """
+
+    def __init__(self, directory: str, max_bytes: Optional[int] = None) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(raw_path: str, params: Dict[str, Any]) -> str:
+        digest = hashlib.sha256()
+        with open(raw_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def spectrum_key(freq: npt.NDArray[np.float64], vals: npt.NDArray[np.float64], params: Dict[str, Any]) -> str:
+        digest = hashlib.sha256()
+        for array in (freq, vals):
+            digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def grid_digest(grid: npt.NDArray[np.float64]) -> str:
+        return hashlib.sha256(np.ascontiguousarray(grid, dtype=np.float64).tobytes()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return join(self.directory, f"{key}.npy")
+
+    def get(self, key: str) -> Optional[npt.NDArray[np.float64]]:
+        try:
+            vals = np.load(path := self._path(key))
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        os.utime(path)
+        return vals
+
+    def put(self, key: str, vals: npt.NDArray[np.float64]) -> None:
+        tmp_path = join(self.directory, f".{key}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, vals)
+        os.replace(tmp_path, self._path(key))
+
+    def evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".npy") and not entry.name.startswith("."):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
@@ -0,0 +1,50 @@
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from spectrum.spectrum import Spectrum, range_slice
+
+
+class ConformerMatrix:
+    """Broadened conformers of one spectrum type: one shared frequency axis and one contiguous (conformers x grid)
+    matrix, with a name -> row index. Iterating yields the conformer names in row order.
+    """
+
+    __slots__ = ("names", "freq", "vals", "index")
+
+    def __init__(
+        self,
+        names: List[str],
+        freq: npt.NDArray[np.float64],
+        vals: npt.NDArray[np.float64],
+        dtype: npt.DTypeLike = np.float64,
+    ) -> None:
+        self.names = list(names)
+        self.freq = np.asarray(freq, dtype=np.float64)
+        self.vals = np.ascontiguousarray(vals, dtype=dtype)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        if self.vals.shape != (len(self.names), self.freq.size):
+            raise ValueError(
+                f"Expected a ({len(self.names)} x {self.freq.size}) conformer matrix, got {self.vals.shape}"
+            )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __getitem__(self, name: str) -> Spectrum:
+        """The conformer as a Spectrum viewing the shared axis and its row."""
+        return Spectrum(self.freq, self.vals[self.index[name]], self.vals.dtype)
+
+    def range_vals(self, freq_range: Tuple[float, float]) -> npt.NDArray[np.float64]:
+        """The columns within `freq_range`: a view of the matrix unless the frequency axis is unordered."""
+        if (index := range_slice(self.freq, freq_range)) is None:
+            start, end = sorted(freq_range)
+            index = (self.freq >= start) & (self.freq <= end)
+        return self.vals[:, index]
@@ -0,0 +1,115 @@
+"""Binary conformer stores; convert text conformer files with `python -m spectrum.conformer_store <analysis file>`."""
+
+import json
+import os
+import sys
+from functools import lru_cache
+from os.path import dirname, exists, join
+from typing import Dict, List, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from spectrum.spectrum import Spectrum
+from spectrum.spectrum_type import SpectrumType, prefix_by_type, string_to_spectrum_type
+
+
+def raw_store_path(dirpath: str, type: SpectrumType) -> str:
+    return join(dirpath, f"Conformers_{type.name}.store")
+
+
+def broadened_store_path(dirpath: str, type: SpectrumType) -> str:
+    return join(dirpath, f"Spectra_{type.name}.store")
+
+
+class ConformerStore:
+    """Stacked conformer spectra of one spectrum type, saved as a directory of `.npy` files.
+
+    Broadened spectra share one frequency axis, so `vals` is a (conformers x grid) matrix. Raw transition lists have
+    a different length per conformer, so `freq` and `vals` are concatenated and `offsets` delimits each conformer.
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        freq: npt.NDArray[np.float64],
+        vals: npt.NDArray[np.float64],
+        offsets: Optional[npt.NDArray[np.int64]] = None,
+    ) -> None:
+        self.names = list(names)
+        self.freq = freq
+        self.vals = vals
+        self.offsets = offsets
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "ConformerStore":
+        mmap_mode = "r" if mmap else None
+        return cls(
+            names=np.load(join(path, "names.npy")).tolist(),
+            freq=np.load(join(path, "freq.npy"), mmap_mode=mmap_mode),
+            vals=np.load(join(path, "vals.npy"), mmap_mode=mmap_mode),
+            offsets=np.load(join(path, "offsets.npy")) if exists(join(path, "offsets.npy")) else None,
+        )
+
+    @classmethod
+    def from_spectra(cls, spectra: Dict[str, Spectrum]) -> "ConformerStore":
+        lengths = [spectrum.freq().size for spectrum in spectra.values()]
+        return cls(
+            names=list(spectra),
+            freq=np.concatenate([spectrum.freq() for spectrum in spectra.values()]),
+            vals=np.concatenate([spectrum.vals() for spectrum in spectra.values()]),
+            offsets=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+        )
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(join(path, "names.npy"), np.array(self.names, dtype=str))
+        np.save(join(path, "freq.npy"), np.ascontiguousarray(self.freq))
+        np.save(join(path, "vals.npy"), np.ascontiguousarray(self.vals))
+        if self.offsets is not None:
+            np.save(join(path, "offsets.npy"), self.offsets)
+        elif exists(join(path, "offsets.npy")):
+            os.remove(join(path, "offsets.npy"))
+
+    def spectrum(self, name: str) -> Spectrum:
+        i = self.index[name]
+        if self.offsets is None:
+            return Spectrum(self.freq, self.vals[i])
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return Spectrum(self.freq[start:end], self.vals[start:end])
+
+    def rows(self, names: List[str]) -> npt.NDArray[np.float64]:
+        """Rows of a shared-axis store in the order of `names`; a memory-mapped view when the order already matches."""
+        if self.names == list(names):
+            return self.vals
+        return self.vals[[self.index[name] for name in names]]
+
+
+@lru_cache(maxsize=8)
+def open_store(path: str) -> ConformerStore:
+    """Memory-maps a store once per process, so that repeated lookups from the same worker share its pages."""
+    return ConformerStore.load(path)
+
+
+def convert_text_conformers(dirpath: str, type: SpectrumType, names: List[str]) -> str:
+    """Packs the `<prefix><name>` text conformer files of one spectrum type into a raw ConformerStore."""
+    spectra = {name: Spectrum.from_path(join(dirpath, f"{prefix_by_type[type]}{name}")) for name in names}
+    ConformerStore.from_spectra(spectra).save(path := raw_store_path(dirpath, type))
+    return path
+
+
+def convert_analysis_file(path: str) -> List[str]:
+    with open(path) as f:
+        params = json.load(f)
+    return [
+        convert_text_conformers(dirname(path), string_to_spectrum_type(data["type"]), list(params["energies"]))
+        for data in params["spectra_data"]
+    ]
+
+
+if __name__ == "__main__":
+    for store in convert_analysis_file(
+        sys.argv[1] if len(sys.argv) > 1 else join(os.getcwd(), "GA_Analysis_File.json")
+    ):
+        print(f"Conformer store written at: {store}")
@@ -1,12 +1,92 @@
 import os
-from os.path import dirname, join
-from typing import Dict, List, Tuple
+from concurrent.futures import Executor
+from functools import cached_property, partial
+from os.path import dirname, exists, join
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 import numpy as np
 import numpy.typing as npt
 
+from instrumentation import instrumentation
+from spectrum.broadening_cache import BroadeningCache
+from spectrum.conformer_matrix import ConformerMatrix
+from spectrum.conformer_store import ConformerStore, broadened_store_path, open_store, raw_store_path
+from spectrum.loader import load_columns, load_conformers, parse_columns
+from spectrum.low_rank import LowRankBasis, low_rank_basis
 from spectrum.spectrum import Spectrum
-from spectrum.spectrum_type import SpectrumType, broaden_funcs, prefix_by_type
+from spectrum.spectrum_type import SpectrumType, broaden_backends, prefix_by_type
+
+BROADENING_CHUNKSIZE = 8
+
+
+class BroadeningSettings(NamedTuple):
+    type: SpectrumType
+    backend: str
+    freq_range: Tuple[float, float]
+    hwhm: float
+    grid: npt.NDArray[np.float64]
+    scaling_factors: List[List[float]]
+    cutoff_hwhm: Optional[float]
+    mirroring_option: float
+    path_length: float
+    molar_concentration: float
+    input_dir: str
+    output_dir: str
+    cache: Optional[BroadeningCache]
+    cache_params: Dict[str, Any]
+    raw_store: Optional[str] = None
+    write_text: bool = True
+    dtype: npt.DTypeLike = np.float64
+
+
+CacheLookup = Tuple[Optional[str], Optional[npt.NDArray[np.float64]]]
+
+
+def lookup_conformer(settings: BroadeningSettings, fname: str) -> CacheLookup:
+    """The cache key of a conformer file and its cached broadened values, if any; only hashes the file."""
+    if settings.cache is None:
+        return None, None
+    key = settings.cache.key(join(settings.input_dir, f"{prefix_by_type[settings.type]}{fname}"), settings.cache_params)
+    return key, settings.cache.get(key)
+
+
+def broaden_conformer(
+    settings: BroadeningSettings, fname: str, raw: Optional[Spectrum] = None, lookup: Optional[CacheLookup] = None
+) -> npt.NDArray[np.float64]:
+    """Reads, broadens and writes a single conformer; kept at module level so that it can run in a worker process.
+
+    `raw` may carry the already parsed conformer file, otherwise it is read here, and `lookup` the conformer's
+    `lookup_conformer`, otherwise the cache is looked up here.
+    """
+    path = join(settings.input_dir, f"{prefix_by_type[settings.type]}{fname}")
+    if settings.raw_store is not None:
+        raw = open_store(settings.raw_store).spectrum(fname)
+        key = (
+            None
+            if settings.cache is None
+            else settings.cache.spectrum_key(raw.freq(), raw.vals(), settings.cache_params)
+        )
+        vals = None if key is None else settings.cache.get(key)
+    else:
+        key, vals = lookup_conformer(settings, fname) if lookup is None else lookup
+    if vals is None:
+        broadened = broaden_backends[settings.backend][settings.type](
+            spectrum=raw if raw is not None else Spectrum.from_path(path),
+            freq_range=settings.freq_range,
+            hwhm=settings.hwhm,
+            grid=settings.grid,
+            intervals=settings.scaling_factors,
+            cutoff=settings.cutoff_hwhm,
+        )
+        vals = np.asarray(broadened.vals(), dtype=settings.dtype) * settings.mirroring_option
+        vals *= 1 / (settings.path_length * settings.molar_concentration)
+        if key is not None:
+            settings.cache.put(key, vals)
+    if settings.write_text:
+        Spectrum(settings.grid.astype(np.single), vals).write(
+            join(settings.output_dir, f"{prefix_by_type[settings.type]}{fname}.dat")
+        )
+    return vals
 
 
 class ExperimentalSpectrum(Spectrum):
@@ -25,8 +105,16 @@ class ExperimentalSpectrum(Spectrum):
         is_reference_candidate: bool,
         energies: Dict[str, float],
         already_broadened: bool,
+        cutoff_hwhm: Optional[float] = None,
+        broadening_backend: str = "direct",
+        broadening_cache: Optional[BroadeningCache] = None,
+        executor: Optional[Executor] = None,
+        conformer_store: bool = False,
+        dtype: npt.DTypeLike = np.float64,
+        low_rank_tolerance: Optional[float] = None,
     ) -> "ExperimentalSpectrum":
-        data = np.loadtxt(path, dtype=np.float64)
+        with instrumentation.stage("input/parse"):
+            data = parse_columns(path)
         return cls(
             freq=data[:, 0],
             vals=data[:, 1],
@@ -42,6 +130,13 @@ class ExperimentalSpectrum(Spectrum):
             is_reference_candidate=is_reference_candidate,
             energies=energies,
             already_broadened=already_broadened,
+            cutoff_hwhm=cutoff_hwhm,
+            broadening_backend=broadening_backend,
+            broadening_cache=broadening_cache,
+            executor=executor,
+            conformer_store=conformer_store,
+            dtype=dtype,
+            low_rank_tolerance=low_rank_tolerance,
         )
 
     def __init__(
@@ -60,8 +155,21 @@ class ExperimentalSpectrum(Spectrum):
         is_reference_candidate: bool,
         energies: Dict[str, float],
         already_broadened: bool,
+        cutoff_hwhm: Optional[float] = None,
+        broadening_backend: str = "direct",
+        broadening_cache: Optional[BroadeningCache] = None,
+        executor: Optional[Executor] = None,
+        conformer_store: bool = False,
+        dtype: npt.DTypeLike = np.float64,
+        low_rank_tolerance: Optional[float] = None,
     ) -> None:
-        super().__init__(freq, vals)
+        """`dtype` is the precision of the experimental values and of the broadened conformer matrix.
+
+        With a `low_rank_tolerance` the broadened conformers are also compressed into a basis reconstructing them within
+        that relative error, see `low_rank_products`.
+        """
+        super().__init__(freq, vals, dtype)
+        self.dtype = np.dtype(dtype)
         self.type = type
         self.mirroring_option = mirroring_option
         self.path_length = path_length
@@ -69,50 +177,153 @@ class ExperimentalSpectrum(Spectrum):
         self.hwhm = hwhm
         self.freq_range = freq_range
         self.scaling_factors = scaling_factors
+        self.cutoff_hwhm = cutoff_hwhm
+        self.broadening_backend = broadening_backend
+        self.broadening_cache = broadening_cache
+        self.conformer_store = conformer_store
         self.is_opt_candidate = is_opt_candidate
         self.is_reference_candidate = is_reference_candidate
         self.energies = energies
-        self.broadened, self.broadened_vals = self._broadening(broadening_dir, energies, already_broadened)
+        with instrumentation.stage(f"broadening/{type.name}"):
+            self.broadened, self.broadened_vals = self._broadening(
+                broadening_dir, energies, already_broadened, executor
+            )
+        self.broadened_dot_vals, self.vals_dot_vals = self._dot_products()
+        self.low_rank: Optional[LowRankBasis] = None
+        self.low_rank_dot_vals: Optional[npt.NDArray[np.float64]] = None
+        if low_rank_tolerance is not None:
+            with instrumentation.stage(f"compression/{type.name}"):
+                self.low_rank, self.low_rank_dot_vals = self.low_rank_products(low_rank_tolerance)
 
     def _broadening(
-        self, broadening_dir: str, energies: Dict[str, float], already_broadened: bool
-    ) -> Tuple[Dict[str, Spectrum], npt.NDArray[np.float64]] | None:
-        broadened = (
-            self.__broaden(broadening_dir, energies)
-            if not already_broadened
-            else self.__skip_broaden(broadening_dir, energies)
+        self,
+        broadening_dir: str,
+        energies: Dict[str, float],
+        already_broadened: bool,
+        executor: Optional[Executor] = None,
+    ) -> Tuple[ConformerMatrix, npt.NDArray[np.float64]]:
+        """All conformers in one matrix, and a view of its columns within the fitted range."""
+        if not already_broadened:
+            freq, broadened_matrix = self.__broaden(broadening_dir, energies, executor)
+        elif self.conformer_store:
+            freq, broadened_matrix = self.__load_broadened(broadening_dir, energies)
+        elif (batch := load_conformers(broadening_dir, prefix_by_type[self.type], list(energies))).vals is not None:
+            freq, broadened_matrix = batch.freq, batch.vals
+        else:
+            # conformers broadened on different axes only share the points within the fitted range
+            spectra = [Spectrum(data[:, 0], data[:, 1]) for data in batch.data]
+            try:
+                freq = spectra[0].freq(self.freq_range)
+                broadened_matrix = np.array([spectrum.vals(self.freq_range) for spectrum in spectra])
+                broadened = ConformerMatrix(batch.names, freq, broadened_matrix, self.dtype)
+            except ValueError:
+                print(
+                    f"There was an issue with the broadened spectra. Are you sure the broadening is correct? already_broadened={already_broadened}"
+                )
+                raise
+            return broadened, broadened.vals
+        broadened = ConformerMatrix(list(energies), freq, broadened_matrix, self.dtype)
+        return broadened, broadened.range_vals(self.freq_range)
+
+    def low_rank_products(self, tolerance: float) -> Tuple[LowRankBasis, npt.NDArray[np.float64]]:
+        """The compressed conformers B ~ C @ V and the experimental spectrum projected onto the basis, V @ e.
+
+        Simulated spectra then live in the basis as `weights @ C`, so their Tanimoto against the experiment costs
+        O(conformers x rank) instead of O(conformers x grid).
+        """
+        low_rank = low_rank_basis(self.broadened_vals, tolerance)
+        return low_rank, low_rank.basis @ self.vals(self.freq_range)
+
+    def _dot_products(self) -> Tuple[npt.NDArray[np.float64], float]:
+        """Grid-independent products needed by the Tanimoto overlap, besides the Gram matrix: B @ e and e @ e."""
+        vals = self.vals(self.freq_range)
+        return self.broadened_vals @ vals, vals @ vals
+
+    @cached_property
+    def broadened_gram(self) -> npt.NDArray[np.float64]:
+        """B @ B.T, computed on first use: the "lowrank" engine only needs it for memetic refinement or clustering."""
+        return self.broadened_vals @ self.broadened_vals.T
+
+    @property
+    def low_rank_coefficients(self) -> Optional[npt.NDArray[np.float64]]:
+        return None if self.low_rank is None else self.low_rank.coefficients
+
+    @low_rank_coefficients.setter
+    def low_rank_coefficients(self, coefficients: Optional[npt.NDArray[np.float64]]) -> None:
+        self.low_rank = self.low_rank._replace(coefficients=coefficients)
+
+    def __broaden(
+        self, dirpath: str, energies: Dict[str, float], executor: Optional[Executor] = None
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """Broadens every conformer, in `executor` when given, straight into rows of a (conformers x grid) matrix."""
+        raw_store = raw_store_path(dirpath, self.type)
+        settings = BroadeningSettings(
+            type=self.type,
+            backend=self.broadening_backend,
+            freq_range=self.freq_range,
+            hwhm=self.hwhm,
+            grid=self.freq(),
+            scaling_factors=self.scaling_factors,
+            cutoff_hwhm=self.cutoff_hwhm,
+            mirroring_option=self.mirroring_option,
+            path_length=self.path_length,
+            molar_concentration=self.molar_concentration,
+            input_dir=dirpath,
+            output_dir=f"{dirpath}/Spectra_{self.type.name}",
+            cache=self.broadening_cache,
+            cache_params=self.__broadening_params(),
+            raw_store=raw_store if self.conformer_store and exists(raw_store) else None,
+            write_text=not self.conformer_store,
+            dtype=self.dtype,
         )
-        try:
-            return broadened, np.array([spec.vals(self.freq_range) for spec in broadened.values()])
-        except ValueError:
-            print(
-                f"There was an issue with the broadened spectra. Are you sure the broadening is correct? already_broadened={already_broadened}"
-            )
-            raise
-
-    def __write_broadened(self, broadened: Dict[str, Spectrum], dir: str) -> None:
-        os.makedirs(dir, exist_ok=True)
-        for fname, spectrum in broadened.items():
-            spectrum.write(join(dir, f"{prefix_by_type[self.type]}{fname}.dat"))
-
-    def __broaden(self, dirpath: str, energies: Dict[str, float]) -> Dict[str, Spectrum]:
-        broadened = {
-            fname: broaden_funcs[self.type](
-                spectrum=Spectrum.from_path(join(dirpath, (f"{prefix_by_type[self.type]}{fname}"))),
-                freq_range=self.freq_range,
-                hwhm=self.hwhm,
-                grid=self.freq(),
-                intervals=self.scaling_factors,
+        if settings.write_text:
+            os.makedirs(settings.output_dir, exist_ok=True)
+        if executor is not None:
+            rows = executor.map(partial(broaden_conformer, settings), energies, chunksize=BROADENING_CHUNKSIZE)
+        elif settings.raw_store is None:
+            # in-process broadening looks up the cache first, then reads the missing conformer files up front on a
+            # thread pool, so that a fully cached rerun parses none of them
+            lookups = [lookup_conformer(settings, fname) for fname in energies]
+            misses = [fname for fname, (_, vals) in zip(energies, lookups) if vals is None]
+            paths = [join(dirpath, f"{prefix_by_type[self.type]}{fname}") for fname in misses]
+            raws = dict(zip(misses, (Spectrum(data[:, 0], data[:, 1]) for data in load_columns(paths))))
+            rows = (
+                broaden_conformer(settings, fname, raws.get(fname), lookup) for fname, lookup in zip(energies, lookups)
             )
-            * self.mirroring_option
-            * (1 / (self.path_length * self.molar_concentration))
-            for fname in energies
-        }
-        self.__write_broadened(broadened, f"{dirpath}/Spectra_{self.type.name}")
-        return broadened
+        else:
+            rows = map(partial(broaden_conformer, settings), energies)
+        broadened_matrix = np.empty((len(energies), self.freq().size), dtype=self.dtype)
+        for i, vals in enumerate(instrumentation.iterate(f"broadening/{self.type.name}/conformer", rows)):
+            broadened_matrix[i] = vals
+        if self.broadening_cache is not None:
+            self.broadening_cache.evict()
+        freq = self.freq().astype(np.single).astype(np.float64)
+        if self.conformer_store:
+            ConformerStore(list(energies), freq, broadened_matrix).save(broadened_store_path(dirpath, self.type))
+        return freq, broadened_matrix
+
+    def __load_broadened(
+        self, dirpath: str, energies: Dict[str, float]
+    ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        store = ConformerStore.load(broadened_store_path(dirpath, self.type))
+        return store.freq, store.rows(list(energies))
 
-    def __skip_broaden(self, dirpath: str, energies: Dict[str, float]) -> Dict[str, Spectrum]:
-        return {fname: Spectrum.from_path(join(dirpath, (f"{prefix_by_type[self.type]}{fname}"))) for fname in energies}
+    def __broadening_params(self) -> Dict[str, Any]:
+        # double precision keeps the keys of caches written before the precision became configurable
+        precision = {} if self.dtype == np.float64 else {"dtype": self.dtype.name}
+        return {
+            **precision,
+            "type": self.type.name,
+            "hwhm": self.hwhm,
+            "grid": BroadeningCache.grid_digest(self.freq()),
+            "freq_range": list(self.freq_range),
+            "scaling_factors": self.scaling_factors,
+            "mirroring_option": self.mirroring_option,
+            "path_length": self.path_length,
+            "molar_concentration": self.molar_concentration,
+            "cutoff_hwhm": self.cutoff_hwhm,
+            "broadening_backend": self.broadening_backend,
+        }
 
     def simulated_vals(self, weights: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
-        return weights @ self.broadened_vals
+        return weights.astype(self.dtype, copy=False) @ self.broadened_vals
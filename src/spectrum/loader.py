@@ -0,0 +1,102 @@
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+
+class ConformerFileError(ValueError):
+    def __init__(self, path: str, line: int, message: str) -> None:
+        super().__init__(f"{path}:{line}: {message}")
+        self.path = path
+        self.line = line
+
+
+class ConformerBatch(NamedTuple):
+    names: List[str]
+    data: List[npt.NDArray[np.float64]]
+    freq: Optional[npt.NDArray[np.float64]]
+    vals: Optional[npt.NDArray[np.float64]]
+
+
+def _parse_lines(path: str, text: str) -> npt.NDArray[np.float64]:
+    rows, n_columns = [], None
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not (fields := line.split("#", 1)[0].split()):
+            continue
+        if n_columns is None:
+            n_columns = len(fields)
+        elif len(fields) != n_columns:
+            raise ConformerFileError(path, line_number, f"expected {n_columns} columns, found {len(fields)}")
+        try:
+            rows.append([float(field) for field in fields])
+        except ValueError as e:
+            raise ConformerFileError(path, line_number, str(e)) from None
+    if not rows:
+        raise ConformerFileError(path, 1, "no data")
+    return np.array(rows, dtype=np.float64)
+
+
+def _fields_per_line(data: bytes, n_lines: int) -> npt.NDArray[np.int64]:
+    """Number of whitespace separated fields on each of the first `n_lines` lines of `data`."""
+    chars = np.frombuffer(data, dtype=np.uint8)
+    # every separator is at most b" "; other control bytes already fail the parser's value count
+    space = chars <= ord(" ")
+    starts = np.flatnonzero(~space[1:] & space[:-1]) + 1
+    if chars.size and not space[0]:
+        starts = np.concatenate(([0], starts))
+    lines = np.searchsorted(np.flatnonzero(chars == ord("\n")), starts)
+    return np.bincount(lines, minlength=n_lines)[:n_lines]
+
+
+def parse_columns(path: str) -> npt.NDArray[np.float64]:
+    """Parses a whitespace separated numeric text file into a (rows x columns) array.
+
+    The whole buffer goes through numpy's C float parser in one call. Whenever a line does not hold as many fields as
+    the first one, or the number of parsed values does not match rows x columns (comments, blank lines, malformed
+    entries), the file is re-read line by line, which either succeeds or raises a ConformerFileError pointing at the
+    offending line.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    text = data.decode()
+    if "#" not in text:
+        first_line = text.lstrip().split("\n", 1)[0]
+        n_columns = len(first_line.split())
+        n_rows = text.count("\n") + (0 if text.endswith("\n") else 1)
+        try:
+            with warnings.catch_warnings():
+                # numpy deprecates stopping silently at unparsable data; treat it as the error it is going to become
+                warnings.simplefilter("error", DeprecationWarning)
+                values = np.fromstring(text, dtype=np.float64, sep=" ")
+        except (ValueError, DeprecationWarning):
+            values = None
+        if (
+            n_columns
+            and values is not None
+            and values.size == n_rows * n_columns
+            and np.all(_fields_per_line(data, n_rows) == n_columns)
+        ):
+            return values.reshape(n_rows, n_columns)
+    return _parse_lines(path, text)
+
+
+def load_columns(paths: List[str], workers: Optional[int] = None) -> List[npt.NDArray[np.float64]]:
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_columns, paths))
+
+
+def load_conformers(
+    dirpath: str, prefix: str, names: List[str], suffix: str = "", workers: Optional[int] = None
+) -> ConformerBatch:
+    """Loads every `<prefix><name><suffix>` conformer file concurrently, stacked when their grids match."""
+    data = load_columns([join(dirpath, f"{prefix}{name}{suffix}") for name in names], workers)
+    shared = bool(data) and all(d.shape == data[0].shape and np.array_equal(d[:, 0], data[0][:, 0]) for d in data[1:])
+    return ConformerBatch(
+        names=list(names),
+        data=data,
+        freq=data[0][:, 0] if shared else None,
+        vals=np.stack([d[:, 1] for d in data]) if shared else None,
+    )
@@ -0,0 +1,71 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+INITIAL_RANK = 16
+OVERSAMPLING = 10
+POWER_ITERATIONS = 2
+
+
+class LowRankBasis(NamedTuple):
+    """(conformers x grid) matrix B ~ `coefficients` @ `basis`, where the rows of `basis` are orthonormal.
+
+    `error` is the achieved relative reconstruction error ||B - coefficients @ basis||_F / ||B||_F.
+    """
+
+    coefficients: npt.NDArray[np.float64]
+    basis: npt.NDArray[np.float64]
+    error: float
+
+    @property
+    def rank(self) -> int:
+        return len(self.basis)
+
+
+def _truncate(
+    vals: npt.NDArray[np.float64], squared_norm: float, tolerance: float, left: Optional[npt.NDArray[np.float64]] = None
+) -> Optional[LowRankBasis]:
+    """The smallest truncation of the SVD of `left.T @ vals` within `tolerance`, None if even the full one is not.
+
+    `left` has orthonormal columns, so the truncated reconstruction is an orthogonal projection of `vals` and its
+    squared error is exactly the squared norm of `vals` minus the retained squared singular values. Without `left`
+    the SVD of `vals` itself is truncated, keeping every singular value if rounding leaves the tolerance unmet.
+    """
+    u, s, vt = np.linalg.svd(vals if left is None else left.T @ vals, full_matrices=False)
+    residuals = np.sqrt(np.maximum(squared_norm - np.cumsum(s**2), 0.0) / squared_norm)
+    if (within := np.flatnonzero(residuals <= tolerance)).size > 0:
+        rank = int(within[0]) + 1
+    elif left is None:
+        rank = s.size
+    else:
+        return None
+    u = u[:, :rank] if left is None else left @ u[:, :rank]
+    return LowRankBasis(u * s[:rank], vt[:rank], float(residuals[rank - 1]))
+
+
+def low_rank_basis(vals: npt.NDArray[np.float64], tolerance: float, seed: int = 0) -> LowRankBasis:
+    """Compresses the rows of `vals` into the smallest basis meeting the relative `tolerance`.
+
+    The range of `vals` is sketched with a randomized range finder whose rank doubles until the tolerance is met; once
+    the sketch would be as wide as the smaller side of the matrix, the exact truncated SVD is taken instead. The
+    factors are computed in double precision and returned in the precision of `vals`.
+    """
+    matrix = np.asarray(vals, dtype=np.float64)
+    n, m = matrix.shape
+    if (squared_norm := float(np.sum(matrix**2))) == 0.0:
+        return LowRankBasis(np.zeros((n, 1), dtype=vals.dtype), np.eye(1, m, dtype=vals.dtype), 0.0)
+    rng = np.random.default_rng(seed)
+    rank = INITIAL_RANK
+    while (sketch_size := rank + OVERSAMPLING) < min(n, m):
+        sketch = matrix @ rng.standard_normal((m, sketch_size))
+        for _ in range(POWER_ITERATIONS):
+            sketch = matrix @ (matrix.T @ np.linalg.qr(sketch)[0])
+        if (compressed := _truncate(matrix, squared_norm, tolerance, np.linalg.qr(sketch)[0])) is not None:
+            break
+        rank *= 2
+    else:
+        compressed = _truncate(matrix, squared_norm, tolerance)
+    return LowRankBasis(
+        compressed.coefficients.astype(vals.dtype), compressed.basis.astype(vals.dtype), compressed.error
+    )
@@ -1,19 +1,41 @@
-from functools import lru_cache
-from typing import Tuple
+from typing import Dict, Optional, Tuple, Union
 
 import numpy as np
 import numpy.typing as npt
 
+from spectrum.loader import parse_columns
+
+
+def range_slice(freq: npt.NDArray[np.float64], freq_range: Tuple[float, float]) -> Optional[slice]:
+    """Slice of the points of a monotonic `freq` lying within `freq_range` (inclusive), None if not monotonic."""
+    start, end = sorted(freq_range)
+    steps = np.diff(freq)
+    if np.all(steps >= 0):
+        return slice(int(np.searchsorted(freq, start, side="left")), int(np.searchsorted(freq, end, side="right")))
+    if np.all(steps <= 0):
+        reversed_freq = freq[::-1]
+        lower = int(np.searchsorted(reversed_freq, start, side="left"))
+        upper = int(np.searchsorted(reversed_freq, end, side="right"))
+        return slice(freq.size - upper, freq.size - lower)
+    return None
+
 
 class Spectrum:
+    __slots__ = ("_freq", "_vals", "_ranges")
+
     @classmethod
     def from_path(cls, path: str) -> "Spectrum":
-        data = np.loadtxt(path, dtype=np.float64)
+        data = parse_columns(path)
         return cls(freq=data[:, 0], vals=data[:, 1])
 
-    def __init__(self, freq: npt.NDArray[np.float64], vals: npt.NDArray[np.float64]) -> None:
-        self._freq = freq.astype(np.float64)
-        self._vals = vals.astype(np.float64)
+    def __init__(
+        self, freq: npt.NDArray[np.float64], vals: npt.NDArray[np.float64], dtype: npt.DTypeLike = np.float64
+    ) -> None:
+        # columns of parsed files are strided views: contiguous copies keep the products on one BLAS path, also once
+        # the spectrum is pickled into another process
+        self._freq = np.ascontiguousarray(freq, dtype=np.float64)
+        self._vals = np.ascontiguousarray(vals, dtype=dtype)
+        self._ranges: Dict[Tuple[float, float], Union[slice, npt.NDArray[np.bool_]]] = {}
 
     def __str__(self) -> str:
         return f"Spectrum(freq={self._freq}, vals={self._vals})"
@@ -22,7 +44,7 @@ class Spectrum:
         return self.__str__()
 
     def __mul__(self, other: float) -> "Spectrum":
-        return Spectrum(self._freq, self._vals * other)
+        return Spectrum(self._freq, self._vals * other, self._vals.dtype)
 
     def __rmul__(self, other: float) -> "Spectrum":
         return self.__mul__(other)
@@ -31,18 +53,24 @@ class Spectrum:
         self._vals *= other
         return self
 
-    @lru_cache(maxsize=2)
+    def _range(self, freq_range: Tuple[float, float]) -> Union[slice, npt.NDArray[np.bool_]]:
+        """Index of `freq_range`, a slice (so that lookups return views) unless the frequencies are unordered."""
+        if (index := self._ranges.get(freq_range)) is None:
+            if (index := range_slice(self._freq, freq_range)) is None:
+                start, end = sorted(freq_range)
+                index = (self._freq >= start) & (self._freq <= end)
+            self._ranges[freq_range] = index
+        return index
+
     def vals(self, freq_range: Tuple[float, float] = None) -> npt.NDArray[np.float64]:
         if freq_range is None:
             return self._vals
-        start, end = sorted(freq_range)
-        return self._vals[(self._freq >= start) & (self._freq <= end)]
+        return self._vals[self._range(freq_range)]
 
     def freq(self, freq_range: Tuple[float, float] = None) -> npt.NDArray[np.float64]:
         if freq_range is None:
             return self._freq
-        start, end = sorted(freq_range)
-        return self._freq[(self._freq >= start) & (self._freq <= end)]
+        return self._freq[self._range(freq_range)]
 
     def write(self, path: str) -> None:
         with open(path, mode="w", encoding="utf8") as file:
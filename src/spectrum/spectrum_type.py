@@ -1,6 +1,7 @@
 from enum import Enum, auto
 
 from broadening.broadening import ecd_broaden, ir_broaden, uv_broaden, vcd_broaden
+from broadening.fft_broadening import fft_ecd_broaden, fft_ir_broaden, fft_uv_broaden, fft_vcd_broaden
 
 
 class SpectrumType(Enum):
@@ -48,3 +49,16 @@ broaden_funcs = {
     SpectrumType.ECD: ecd_broaden,
     SpectrumType.UV: uv_broaden,
 }
+
+fft_broaden_funcs = {
+    SpectrumType.ROA: fft_ir_broaden,
+    SpectrumType.VCD: fft_vcd_broaden,
+    SpectrumType.IR: fft_ir_broaden,
+    SpectrumType.ECD: fft_ecd_broaden,
+    SpectrumType.UV: fft_uv_broaden,
+}
+
+broaden_backends = {
+    "direct": broaden_funcs,
+    "fft": fft_broaden_funcs,
+}
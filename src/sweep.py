@@ -0,0 +1,112 @@
+"""Runs every point of the "sweep" of an analysis file: `python sweep.py [analysis directory]`.
+
+The spectra, their matrices and the linkage are built once, and each algorithm is tuned once on the analysis file's
+own problem; each point only re-cuts the dendrogram and changes the energy uncertainty, objective or algorithm. The
+consolidated results are written to `sweep_results.csv`.
+"""
+
+import env  # isort:skip
+
+import csv
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from os import getcwd
+from os.path import join
+from typing import Any, Dict, List, Optional, Union
+
+from genetic_algorithm.genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm.parallel_problem import ParallelPopulationProblem
+from main import ANALYSIS_FILE, build_objectives, build_problem, hyperparameter_storage, optimize, summarize
+from objective.classic_objective import ClassicObjective
+from objective.clustering_objective import ClusteringObjective
+from parameters.input_parameters import SWEEP_SETTINGS, InputParameters
+
+SWEEP_RESULTS = "sweep_results.csv"
+
+_state: Dict[str, Any] = {}
+
+
+def _init_worker(state_bytes: bytes) -> None:
+    _state.update(pickle.loads(state_bytes))
+
+
+def point_objective(
+    objectives: Dict[str, Union[ClusteringObjective, ClassicObjective]], point: Dict[str, Any]
+) -> Union[ClusteringObjective, ClassicObjective]:
+    objective = objectives[point["objective"]]
+    if isinstance(objective, ClusteringObjective):
+        objective = objective.with_cut_point(point["dendrogram_threshold"])
+    return objective.with_energy_uncertainty(point["energy_uncertainty"])
+
+
+def tune(
+    ip: InputParameters,
+    objectives: Dict[str, Union[ClusteringObjective, ClassicObjective]],
+    analysis_dir: str,
+    ga_type: str,
+) -> Optional[Dict[str, Any]]:
+    """Hyperparameters of `ga_type` tuned on the problem of the analysis file, shared by all points of the sweep."""
+    problem = build_problem(ip, objectives[ip.objective])
+    try:
+        return GeneticAlgorithm(
+            ga_type, problem, hyperparameter_storage(ip, analysis_dir), ip.hyperparameter_workers
+        ).hyper_params
+    finally:
+        if isinstance(problem, ParallelPopulationProblem):
+            problem.close()
+
+
+def run_point(point: Dict[str, Any]) -> Dict[str, Any]:
+    ip, objectives, analysis_dir = _state["ip"], _state["objectives"], _state["analysis_dir"]
+    objective = point_objective(objectives, point)
+    ga_type = point["genetic_algorithm"]
+    res = optimize(ip, build_problem(ip, objective), analysis_dir, ga_type, _state["hyper_params"][ga_type])
+    return {**point, "n_var": objective.n_var, **summarize(ip, objective, res)}
+
+
+def write_table(path: str, rows: List[Dict[str, Any]]) -> None:
+    """One row per point: its settings, fitness, runtime, stop reason and the Boltzmann weight of every conformer."""
+    names = list(rows[0]["boltzmann_weights"]) if rows else []
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([*SWEEP_SETTINGS, "n_var", "fitness", "runtime", "stop_reason", *names])
+        for row in rows:
+            writer.writerow(
+                [
+                    *(row[setting] for setting in SWEEP_SETTINGS),
+                    row["n_var"],
+                    row["fitness"],
+                    row["runtime"],
+                    row["stop_reason"],
+                    *(row["boltzmann_weights"][name] for name in names),
+                ]
+            )
+
+
+def sweep(analysis_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    analysis_dir = analysis_dir or getcwd()
+    ip = InputParameters(path=join(analysis_dir, ANALYSIS_FILE))
+    defaults = {setting: getattr(ip, setting) for setting in SWEEP_SETTINGS}
+    points = [{**defaults, **point} for point in ip.sweep] or [defaults]
+    objectives = build_objectives(ip)
+    hyper_params = {
+        ga_type: tune(ip, objectives, analysis_dir, ga_type)
+        for ga_type in dict.fromkeys(point["genetic_algorithm"] for point in points)
+    }
+    state = {"ip": ip, "objectives": objectives, "analysis_dir": analysis_dir, "hyper_params": hyper_params}
+
+    if ip.sweep_workers > 1:
+        with ProcessPoolExecutor(ip.sweep_workers, initializer=_init_worker, initargs=(pickle.dumps(state),)) as pool:
+            rows = list(pool.map(run_point, points))
+    else:
+        _state.update(state)
+        rows = [run_point(point) for point in points]
+
+    write_table(path := join(analysis_dir, SWEEP_RESULTS), rows)
+    print(f"{len(rows)} sweep points written at: {path}")
+    return rows
+
+
+if __name__ == "__main__":
+    sweep(sys.argv[1] if len(sys.argv) > 1 else None)
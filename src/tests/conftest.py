@@ -0,0 +1,38 @@
+import json
+import shutil
+import sys
+from os.path import abspath, dirname, join
+from pathlib import Path
+from typing import Any, Callable
+
+# the modules import each other from the source directory, as when running `python main.py` there
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import env  # noqa: E402 isort:skip
+
+import pytest  # noqa: E402
+
+from benchmarks.generator import generate  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def analysis_file(tmp_path_factory: pytest.TempPathFactory) -> str:
+    """A small synthetic analysis: 12 conformers with VCD and IR spectra."""
+    return generate(
+        str(tmp_path_factory.mktemp("analysis")), n_conformers=12, n_modes=20, n_grid=200, spectrum_types=("VCD", "IR")
+    )
+
+
+@pytest.fixture
+def analysis_with(analysis_file: str, tmp_path: Path) -> Callable[..., str]:
+    """Copies the synthetic analysis with some of its settings replaced, and returns the copied analysis file."""
+
+    def copy(**settings: Any) -> str:
+        directory = shutil.copytree(dirname(analysis_file), tmp_path / "analysis", dirs_exist_ok=True)
+        with open(path := join(directory, "GA_Analysis_File.json")) as f:
+            analysis = json.load(f)
+        with open(path, "w") as f:
+            json.dump({**analysis, **settings}, f)
+        return path
+
+    return copy
@@ -0,0 +1,53 @@
+import os
+import signal
+from os.path import basename, dirname
+
+from matplotlib import pyplot as plt
+
+import batch
+from batch import Batch
+from parameters import utils
+from parameters.input_parameters import InputParameters
+
+
+def fake_main(analysis_dir):
+    # the worker pool forks, so the workers run this patched main
+    if basename(analysis_dir) == "crash":
+        os.kill(os.getpid(), signal.SIGKILL)
+    return {"fitness": -1.0, "runtime": 0.0}
+
+
+def test_broken_pools_only_fail_the_job_killing_its_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "main", fake_main)
+    paths = []
+    for name in ("crash", *(f"job{i}" for i in range(5))):
+        (directory := tmp_path / name).mkdir()
+        (path := directory / "GA_Analysis_File.json").write_text("{}")
+        paths.append(str(path))
+
+    summary = Batch(paths, str(tmp_path / "summary.json")).run(workers=2)
+    assert {basename(dirname(path)): entry["status"] for path, entry in summary.items()} == {
+        "crash": "failed",
+        **{f"job{i}": "done" for i in range(5)},
+    }
+    assert "BrokenProcessPool" in summary[paths[0]]["error"]
+    assert all(entry["wall_time"] >= 0 for entry in summary.values())
+
+
+def test_plots_are_closed(analysis_file, tmp_path):
+    ip = InputParameters(analysis_file)
+    plt.close("all")
+    utils.plot_results(str(tmp_path), ip.candidates, ip.energies_array(), ip.eu)
+    assert plt.get_fignums() == []
+
+
+def test_missing_analysis_files_fail_before_any_job(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, "main", fake_main)
+    (directory := tmp_path / "job").mkdir()
+    (path := directory / "GA_Analysis_File.json").write_text("{}")
+    missing = tmp_path / "missing"
+
+    summary = Batch([str(directory), str(missing)], str(tmp_path / "summary.json")).run(workers=1)
+    assert summary[str(path)]["status"] == "done"
+    entry = summary[str(missing)]
+    assert entry["status"] == "failed" and entry["analysis_digest"] is None and "not found" in entry["error"]
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import signal
+import time
+
+import numpy as np
+import pytest
+from pymoo.core.callback import Callback
+
+import genetic_algorithm.genetic_algorithm as genetic_algorithm_module
+from genetic_algorithm import hyperparameter
+from genetic_algorithm.checkpoint import load_checkpoint, restore
+from genetic_algorithm.genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm.termination import build_termination
+from main import build_objectives, build_problem
+from parameters.input_parameters import InputParameters
+
+N_GEN = 30
+INTERVAL = 5
+KILLED_AT = 13
+
+
+class KillAt(Callback):
+    def __init__(self, n_gen: int) -> None:
+        super().__init__()
+        self.n_gen = n_gen
+
+    def notify(self, algorithm) -> None:
+        if algorithm.n_gen == self.n_gen:
+            os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.fixture
+def problem(analysis_file):
+    ip = InputParameters(analysis_file)
+    return build_problem(ip, build_objectives(ip)["classic"])
+
+
+@pytest.fixture(autouse=True)
+def fast_checkpoints(monkeypatch):
+    # saves at every interval, and tunes with a few short trials
+    monkeypatch.setattr(genetic_algorithm_module, "MAX_OVERHEAD", float("inf"))
+    monkeypatch.setattr(hyperparameter, "N_TRIALS", 4)
+    monkeypatch.setattr(hyperparameter, "TRIAL_EVALUATIONS", 100)
+
+
+def checkpointed(ga_type, problem, path, resume=False):
+    return GeneticAlgorithm(ga_type, problem, checkpoint_path=path, checkpoint_interval=INTERVAL, resume=resume)
+
+
+def killed_run(ga_type, problem, path):
+    checkpointed(ga_type, problem, path).run(
+        termination=build_termination({"n_gen": N_GEN}), callback=KillAt(KILLED_AT)
+    )
+
+
+@pytest.mark.parametrize("ga_type", ["PSO", "DE"])
+def test_resumed_run_matches_uninterrupted_run(ga_type, problem, tmp_path):
+    path = str(tmp_path / "ga_checkpoint.pkl")
+    process = multiprocessing.get_context("fork").Process(target=killed_run, args=(ga_type, problem, path))
+    process.start()
+    process.join()
+    assert process.exitcode == -signal.SIGKILL
+
+    resumed = checkpointed(ga_type, problem, path, resume=True)
+    assert resumed.checkpoint is not None and resumed.checkpoint.algorithm.n_gen == KILLED_AT - KILLED_AT % INTERVAL
+    res = resumed.run(termination=build_termination({"n_gen": N_GEN}))
+    expected = GeneticAlgorithm(ga_type, problem).run(termination=build_termination({"n_gen": N_GEN}))
+
+    assert res.algorithm.n_gen == expected.algorithm.n_gen
+    np.testing.assert_array_equal(res.X, expected.X)
+    np.testing.assert_array_equal(res.F, expected.F)
+
+
+def test_resume_applies_the_new_termination_and_excludes_downtime(problem, tmp_path):
+    path = str(tmp_path / "ga_checkpoint.pkl")
+    checkpointed("PSO", problem, path).run(termination=build_termination({"n_gen": 2 * INTERVAL}))
+    resumed = checkpointed("PSO", problem, path, resume=True)
+    elapsed = resumed.checkpoint.elapsed
+
+    time.sleep(0.5)
+    algorithm = restore(load_checkpoint(resumed.checkpoint_path, resumed.fingerprint), problem)
+    assert time.time() - algorithm.start_time < elapsed + 0.5
+
+    res = resumed.run(termination=build_termination({"n_gen": 3 * INTERVAL}))
+    expected = GeneticAlgorithm("PSO", problem).run(termination=build_termination({"n_gen": 3 * INTERVAL}))
+    assert res.algorithm.n_gen == expected.algorithm.n_gen
+    assert res.stop_reason == expected.stop_reason
+    np.testing.assert_array_equal(res.F, expected.F)
+
+
+def test_checkpoints_are_named_per_problem(analysis_file, tmp_path):
+    ip = InputParameters(analysis_file)
+    objectives = build_objectives(ip)
+    path = str(tmp_path / "ga_checkpoint.pkl")
+    paths = {
+        checkpointed("PSO", build_problem(ip, objective.with_energy_uncertainty(error)), path).checkpoint_path
+        for objective in objectives.values()
+        for error in (0.5, 1.0)
+    }
+    assert len(paths) == 4
+
+
+def test_local_searches_are_not_checkpointed(problem, tmp_path):
+    with pytest.raises(ValueError, match="NEDLER_MEAD"):
+        checkpointed("NEDLER_MEAD", problem, str(tmp_path / "ga_checkpoint.pkl"))
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from scipy.cluster.hierarchy import cut_tree, linkage
+
+from objective.cluster_hierarchy import ClusterHierarchy
+
+
+def random_linkage(seed):
+    return linkage(np.random.default_rng(seed).normal(size=(30, 5)), method="complete")
+
+
+def tied_linkage(seed):
+    # integer points under the city block metric merge at many equal heights, duplicated points at height 0
+    points = np.random.default_rng(seed).integers(0, 4, size=(30, 2))
+    return linkage(points, metric="cityblock", method="complete")
+
+
+def heights(hierarchy):
+    """Every threshold, and the heights just above them where the number of clusters changes."""
+    return np.concatenate([hierarchy.thresholds, np.nextafter(hierarchy.thresholds, np.inf)])
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("build", [random_linkage, tied_linkage])
+def test_labels_and_min_energies_match_cut_tree(build, seed):
+    Z = build(seed)
+    hierarchy = ClusterHierarchy(Z)
+    energies = np.random.default_rng(seed).uniform(0, 5, hierarchy.n)
+    if build is tied_linkage:
+        assert hierarchy.thresholds.size < len(Z)
+    for height in heights(hierarchy):
+        clusters = cut_tree(Z, height=height).reshape(-1)
+        np.testing.assert_array_equal(hierarchy.labels(height), clusters)
+        np.testing.assert_array_equal(
+            hierarchy.min_energies(energies, height),
+            [np.min(energies[clusters == cluster]) for cluster in np.sort(np.unique(clusters))],
+        )
+        assert hierarchy.n_clusters(height) == np.unique(clusters).size
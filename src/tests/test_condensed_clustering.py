@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from scipy.cluster.hierarchy import cut_tree, linkage
+
+from overlap import metrics
+from overlap.metrics import condensed_dendrogram_tanimoto, dendrogram_tanimoto
+
+
+def cut_heights(reference):
+    """Heights between consecutive merges, so that both linkages are cut into the same number of clusters."""
+    heights = np.sort(reference[:, 2])
+    return (heights[:-1] + heights[1:]) / 2
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("use_gram", [False, True])
+def test_condensed_clusters_match_the_callable_metric(seed, use_gram, monkeypatch):
+    # a few rows per block, so that the condensed matrix is assembled from several blocks
+    monkeypatch.setattr(metrics, "BLOCK_ELEMENTS", 200)
+    vectors = np.random.default_rng(seed).normal(size=(40, 300))
+    reference = linkage(vectors, metric=dendrogram_tanimoto, method="complete")
+    condensed = linkage(
+        condensed_dendrogram_tanimoto(vectors, gram=vectors @ vectors.T if use_gram else None), method="complete"
+    )
+
+    np.testing.assert_allclose(condensed[:, 2], reference[:, 2], rtol=1e-12)
+    heights = cut_heights(reference)
+    np.testing.assert_array_equal(cut_tree(condensed, height=heights), cut_tree(reference, height=heights))
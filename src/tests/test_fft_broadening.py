@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from benchmarks.generator import conformer_transitions, synthetic_settings
+from broadening.fft_broadening import MAX_RELATIVE_DEVIATION, MAX_STEP_TO_HWHM, fft_compatible
+from spectrum.spectrum import Spectrum
+from spectrum.spectrum_type import SpectrumType, broaden_funcs, fft_broaden_funcs
+
+
+def grid(type, step_to_hwhm=MAX_STEP_TO_HWHM):
+    """The synthetic grid of `type`, with the largest step not above `step_to_hwhm` hwhm."""
+    settings = synthetic_settings[type]
+    lower, upper = settings.grid_range
+    return np.linspace(lower, upper, int(np.ceil((upper - lower) / (step_to_hwhm * settings.hwhm))) + 1)
+
+
+def broadened(broaden, type, seed, step_to_hwhm=MAX_STEP_TO_HWHM, cutoff=None):
+    settings = synthetic_settings[type]
+    transitions = conformer_transitions(type, 1, 100, np.random.default_rng(seed))[0]
+    return broaden(
+        spectrum=Spectrum(transitions[:, 0], transitions[:, 1]),
+        freq_range=settings.interval,
+        hwhm=settings.hwhm,
+        grid=grid(type, step_to_hwhm),
+        intervals=[],
+        cutoff=cutoff,
+    ).vals()
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("type", list(SpectrumType))
+def test_fft_kernels_stay_within_the_deviation_bound(type, seed):
+    assert fft_compatible(grid(type), synthetic_settings[type].hwhm)
+    direct = broadened(broaden_funcs[type], type, seed)
+    fft = broadened(fft_broaden_funcs[type], type, seed)
+    assert np.abs(fft - direct).max() <= MAX_RELATIVE_DEVIATION * np.abs(direct).max()
+
+
+@pytest.mark.parametrize("type", list(SpectrumType))
+def test_cutoffs_are_honoured_by_the_direct_kernels(type):
+    direct = broadened(broaden_funcs[type], type, 0, cutoff=5.0)
+    fft = broadened(fft_broaden_funcs[type], type, 0, cutoff=5.0)
+    np.testing.assert_array_equal(fft, direct)
+
+
+@pytest.mark.parametrize("type", list(SpectrumType))
+def test_coarse_grids_fall_back_to_the_direct_kernels(type):
+    assert not fft_compatible(grid(type, 2 * MAX_STEP_TO_HWHM), synthetic_settings[type].hwhm)
+    direct = broadened(broaden_funcs[type], type, 0, step_to_hwhm=2 * MAX_STEP_TO_HWHM)
+    fft = broadened(fft_broaden_funcs[type], type, 0, step_to_hwhm=2 * MAX_STEP_TO_HWHM)
+    np.testing.assert_array_equal(fft, direct)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from genetic_algorithm.genetic_problem import (
+    classic_fitness,
+    classic_population_fitness,
+    gram_fitness,
+    gram_population_fitness,
+)
+from overlap.weights import boltzmann_weights_matrix
+from parameters.input_parameters import InputParameters
+
+
+@pytest.fixture(scope="module")
+def candidates(analysis_file):
+    return InputParameters(analysis_file).candidates
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_gram_fitness_matches_classic_fitness(candidates, seed):
+    rng = np.random.default_rng(seed)
+    for candidate in candidates:
+        energies = rng.uniform(0, 3, len(candidate.broadened))
+        np.testing.assert_allclose(
+            gram_fitness(energies, candidate), classic_fitness(energies, candidate), rtol=1e-12, atol=1e-12
+        )
+
+
+def test_gram_population_fitness_matches_classic_population_fitness(candidates):
+    for candidate in candidates:
+        energies = np.random.default_rng(0).uniform(0, 3, (64, len(candidate.broadened)))
+        weights = boltzmann_weights_matrix(energies, "kcal/mol")
+        np.testing.assert_allclose(
+            gram_population_fitness(weights, candidate),
+            classic_population_fitness(weights, candidate),
+            rtol=1e-12,
+            atol=1e-12,
+        )
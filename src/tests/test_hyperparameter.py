@@ -0,0 +1,36 @@
+import optuna
+import pytest
+
+from genetic_algorithm import hyperparameter
+from genetic_algorithm.genetic_algorithm import build_algorithm
+from genetic_algorithm.hyperparameter import hyperparameter_optimize
+from main import build_objectives, build_problem
+from parameters.input_parameters import InputParameters
+
+
+@pytest.fixture
+def problem(analysis_file, monkeypatch):
+    monkeypatch.setattr(hyperparameter, "N_TRIALS", 3)
+    monkeypatch.setattr(hyperparameter, "TRIAL_EVALUATIONS", 50)
+    ip = InputParameters(analysis_file)
+    return build_problem(ip, build_objectives(ip)["classic"])
+
+
+def test_stored_study_is_reused(problem, tmp_path, monkeypatch):
+    storage = f"sqlite:///{tmp_path / 'hyperparameters.db'}"
+    tuned = hyperparameter_optimize(build_algorithm("DE"), problem, storage)
+
+    asked = []
+    ask = optuna.Study.ask
+    monkeypatch.setattr(
+        optuna.Study, "ask", lambda study, *args, **kwargs: asked.append(1) or ask(study, *args, **kwargs)
+    )
+    assert hyperparameter_optimize(build_algorithm("DE"), problem, storage) == tuned
+    assert asked == []
+
+
+def test_workers_must_be_positive(problem, analysis_with):
+    with pytest.raises(ValueError, match="hyperparameter workers"):
+        hyperparameter_optimize(build_algorithm("DE"), problem, workers=0)
+    with pytest.raises(ValueError, match="hyperparameter workers"):
+        InputParameters(analysis_with(hyperparameter_workers=0)).hyperparameter_workers
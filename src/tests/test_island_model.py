@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from pymoo.algorithms.soo.nonconvex.ga import FitnessSurvival
+from pymoo.problems.single import Sphere
+
+from genetic_algorithm.genetic_algorithm import build_algorithm
+from genetic_algorithm.island_model import IslandModel, _immigrate, random_pairs
+from genetic_algorithm.termination import build_termination
+
+
+class CountingSurvival(FitnessSurvival):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def do(self, *args, **kwargs):
+        self.calls += 1
+        return super().do(*args, **kwargs)
+
+
+@pytest.fixture
+def algorithm():
+    algorithm = build_algorithm("DE")
+    algorithm.setup(Sphere(), termination=build_termination({"n_gen": 10}), seed=1, verbose=False)
+    for _ in range(3):
+        algorithm.next()
+    algorithm.survival = CountingSurvival()
+    return algorithm
+
+
+def immigrant(algorithm, f):
+    individual = algorithm.opt[0].copy()
+    individual.set("F", np.array([f]))
+    return individual
+
+
+def test_immigrants_replace_only_worse_individuals(algorithm):
+    F = algorithm.pop.get("F")[:, 0]
+    order = np.argsort(F)
+    better, worse = F[order[0]] - 1, F[order[-1]] + 1
+    kept = {tuple(x) for x in algorithm.pop.get("X")[order[:-2]]}
+
+    accepted = _immigrate(
+        algorithm, [immigrant(algorithm, worse), immigrant(algorithm, better), immigrant(algorithm, better)]
+    )
+
+    assert accepted == 2
+    assert algorithm.survival.calls == 1
+    assert len(algorithm.pop) == len(F)
+    assert kept <= {tuple(x) for x in algorithm.pop.get("X")}
+    assert np.sort(algorithm.pop.get("F")[:, 0])[:2].tolist() == [better, better]
+    assert algorithm.opt[0].F[0] == better
+
+
+def test_worse_immigrants_leave_the_population_alone(algorithm):
+    F = algorithm.pop.get("F")[:, 0].copy()
+    assert _immigrate(algorithm, [immigrant(algorithm, F.max() + 1)]) == 0
+    assert algorithm.survival.calls == 0
+    np.testing.assert_array_equal(algorithm.pop.get("F")[:, 0], F)
+
+
+@pytest.mark.parametrize("n_islands", range(2, 9))
+def test_random_pairs_never_pair_an_island_with_itself(n_islands):
+    rng = np.random.default_rng(0)
+    for epoch in range(50):
+        pairs = random_pairs(n_islands, epoch, rng)
+        assert all(source != target for source, target in pairs)
+        assert sorted(source for source, _ in pairs) == list(range(n_islands))
+        assert sorted(target for _, target in pairs) == list(range(n_islands))
+
+
+def test_two_island_runs_are_reproducible():
+    def run():
+        model = IslandModel(build_algorithm("DE"), n_islands=2, migration_interval=2, n_migrants=2)
+        return model.run(Sphere(), build_termination({"n_gen": 5}), seed=3)
+
+    first, second = run(), run()
+    np.testing.assert_array_equal(first.X, second.X)
+    np.testing.assert_array_equal(first.F, second.F)
+    assert first.islands == second.islands
+    assert [stats.n_gen for stats in first.islands] == [5, 5]
@@ -0,0 +1,41 @@
+import json
+import shutil
+from os.path import dirname, join
+
+import numpy as np
+import pytest
+
+from parameters.input_parameters import InputParameters
+from spectrum import loader
+from spectrum.loader import ConformerFileError, parse_columns
+
+
+@pytest.mark.parametrize(
+    "text, line",
+    [("1 2\n3 4 5\n6\n", 2), ("1 2\n3\n4 5 6\n", 2), ("1 2\n3 x\n", 2), ("1 2\n3 4\n5 6 # note\n7\n", 4)],
+)
+def test_malformed_files_report_path_and_line(tmp_path, text, line):
+    (path := tmp_path / "conformer").write_text(text)
+    with pytest.raises(ConformerFileError, match=f"{path}:{line}:"):
+        parse_columns(str(path))
+
+
+@pytest.mark.parametrize("text", ["1 2\n3 4\n", "1 2\n3 4", "\t1  2\r\n 3 4 \r\n", "\n1 2\n\n3 4\n", "# c\n1 2\n3 4\n"])
+def test_well_formed_files(tmp_path, text):
+    (path := tmp_path / "conformer").write_text(text)
+    np.testing.assert_array_equal(parse_columns(str(path)), [[1, 2], [3, 4]])
+
+
+def test_cached_rerun_parses_no_conformer_file(analysis_file, tmp_path, monkeypatch):
+    directory = shutil.copytree(dirname(analysis_file), tmp_path / "analysis")
+    with open(path := join(directory, "GA_Analysis_File.json")) as f:
+        analysis = json.load(f)
+    with open(path, "w") as f:
+        json.dump({**analysis, "broadening_cache_mb": 100}, f)
+    expected = InputParameters(path).candidates[0].broadened_vals
+
+    parsed = []
+    monkeypatch.setattr(loader, "parse_columns", lambda p: parsed.append(p) or parse_columns(p))
+    rerun = InputParameters(path)
+    assert parsed == []
+    np.testing.assert_array_equal(rerun.candidates[0].broadened_vals, expected)
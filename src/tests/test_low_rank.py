@@ -0,0 +1,39 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from genetic_algorithm.genetic_problem import population_fitness_map
+from genetic_algorithm.parallel_problem import ParallelPopulationProblem
+from main import build_objectives
+from parameters.input_parameters import InputParameters
+
+
+@pytest.fixture
+def low_rank_ip(analysis_with):
+    return InputParameters(analysis_with(fitness_engine="lowrank", low_rank_tolerance=1e-2))
+
+
+def test_compressed_candidates_compute_no_gram_matrix(low_rank_ip):
+    for candidate in low_rank_ip.candidates:
+        assert candidate.low_rank is not None
+        assert "broadened_gram" not in vars(candidate)
+        np.testing.assert_allclose(
+            candidate.broadened_gram, candidate.broadened_vals @ candidate.broadened_vals.T, rtol=1e-12
+        )
+
+
+def test_parallel_problem_shares_the_basis_only(low_rank_ip):
+    objective = build_objectives(low_rank_ip)["classic"]
+    with ParallelPopulationProblem(objective, population_fitness_map["lowrank"], workers=2) as problem:
+        assert {attribute for _, attribute in problem.shared.handles} == {"low_rank_coefficients", "low_rank_dot_vals"}
+        with problem.shared.detached() as detached:
+            shipped = pickle.loads(pickle.dumps(detached))
+    for candidate in shipped.candidates:
+        assert candidate.broadened_vals is None and candidate.broadened_gram is None
+
+
+@pytest.mark.parametrize("tolerance", [-1e-3, 1.0])
+def test_invalid_tolerances_are_rejected(analysis_with, tolerance):
+    with pytest.raises(ValueError, match="low rank tolerance"):
+        InputParameters(analysis_with(fitness_engine="lowrank", low_rank_tolerance=tolerance))
@@ -0,0 +1,16 @@
+from genetic_algorithm.genetic_algorithm import GeneticAlgorithm
+from genetic_algorithm.memetic import MemeticRefinement
+from genetic_algorithm.termination import build_termination
+from main import build_objectives, build_problem
+from parameters.input_parameters import InputParameters
+
+
+def test_refinement_evaluations_are_counted(analysis_file):
+    ip = InputParameters(analysis_file)
+    problem = build_problem(ip, build_objectives(ip)["classic"])
+    plain = GeneticAlgorithm("DE", problem, hyper_params={}).run(termination=build_termination({"n_gen": 5}))
+    memetic = GeneticAlgorithm("DE", problem, hyper_params={}).run(
+        termination=build_termination({"n_gen": 5}), callback=MemeticRefinement(5, top_k=2)
+    )
+    # besides the two refined individuals evaluated by the problem, every L-BFGS-B step is counted
+    assert memetic.algorithm.evaluator.n_eval > plain.algorithm.evaluator.n_eval + 2
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from genetic_algorithm.genetic_problem import PopulationGeneticProblem, population_fitness_map
+from genetic_algorithm.parallel_problem import ParallelPopulationProblem
+from main import build_objectives
+from parameters.input_parameters import InputParameters
+
+
+@pytest.mark.parametrize("objective_name", ["classic", "clustering"])
+@pytest.mark.parametrize("engine", list(population_fitness_map))
+def test_parallel_evaluation_is_bit_identical_to_serial(analysis_with, engine, objective_name):
+    ip = InputParameters(analysis_with(fitness_engine=engine, low_rank_tolerance=1e-2))
+    objective = build_objectives(ip)[objective_name]
+    population_fitness = population_fitness_map[engine]
+    # an odd population size, so that the last tile is shorter
+    x = np.random.default_rng(0).uniform(objective.lower, objective.upper, (37, objective.n_var))
+    expected = {}
+    PopulationGeneticProblem(objective, population_fitness, tile_size=8)._evaluate(x, expected)
+
+    with ParallelPopulationProblem(objective, population_fitness, tile_size=8, workers=2) as problem:
+        out = {}
+        problem._evaluate(x, out)
+    np.testing.assert_array_equal(out["F"], expected["F"])
+
+
+@pytest.mark.parametrize("setting", ["evaluation_tile_size", "evaluation_workers"])
+@pytest.mark.parametrize("value", [0, -1])
+def test_evaluation_settings_must_be_positive(analysis_with, setting, value):
+    with pytest.raises(ValueError, match=setting.replace("_", " ")):
+        getattr(InputParameters(analysis_with(**{setting: value})), setting)
@@ -0,0 +1,14 @@
+import pickle
+
+import numpy as np
+
+from spectrum.spectrum import Spectrum
+
+
+def test_parsed_columns_are_stored_contiguously(tmp_path):
+    (path := tmp_path / "spectrum").write_text("".join(f"{x} {x**2}\n" for x in range(10)))
+    spectrum = Spectrum.from_path(str(path))
+    for copy in (spectrum, pickle.loads(pickle.dumps(spectrum))):
+        assert copy.freq().flags.c_contiguous and copy.vals().flags.c_contiguous
+        assert copy.vals((2, 6)).flags.c_contiguous
+        np.testing.assert_array_equal(copy.vals((2, 6)), [4, 9, 16, 25, 36])
@@ -0,0 +1,52 @@
+from os.path import dirname
+
+import pytest
+
+import genetic_algorithm.genetic_algorithm as genetic_algorithm_module
+import sweep as sweep_module
+from genetic_algorithm import hyperparameter
+from parameters.input_parameters import InputParameters
+
+
+def test_each_algorithm_is_tuned_once(analysis_with, monkeypatch):
+    monkeypatch.setattr(hyperparameter, "N_TRIALS", 2)
+    monkeypatch.setattr(hyperparameter, "TRIAL_EVALUATIONS", 50)
+    tuned = []
+    hyperparameter_optimize = genetic_algorithm_module.hyperparameter_optimize
+    monkeypatch.setattr(
+        genetic_algorithm_module,
+        "hyperparameter_optimize",
+        lambda algorithm, problem, *args: tuned.append(type(algorithm).__name__)
+        or hyperparameter_optimize(algorithm, problem, *args),
+    )
+    sweep = {
+        "energy_uncertainty": [0.5, 1.0],
+        "objective": ["clustering", "classic"],
+        "genetic_algorithm": ["GA", "DE"],
+    }
+    path = analysis_with(sweep=sweep, **{"termination_criterion(ngen)": 3})
+
+    rows = sweep_module.sweep(dirname(path))
+    assert len(rows) == 8
+    assert sorted(tuned) == ["DE", "GA"]
+
+
+@pytest.mark.parametrize(
+    "point, error",
+    [
+        ({"energy_uncertainty": -1.0}, ValueError),
+        ({"dendrogram_threshold": -0.1}, ValueError),
+        ({"objective": "spectral"}, KeyError),
+        ({"genetic_algorithm": "GA2"}, KeyError),
+    ],
+)
+def test_invalid_points_are_rejected(analysis_with, point, error):
+    path = analysis_with(sweep=[point])
+    with pytest.raises(error):
+        InputParameters(path).sweep
+
+
+def test_points_are_checked_with_the_settings_depending_on_them(analysis_with):
+    path = analysis_with(islands=2, sweep=[{"genetic_algorithm": "PSO"}])
+    with pytest.raises(KeyError, match="islands"):
+        InputParameters(path).sweep
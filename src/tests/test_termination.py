@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+import numpy as np
+from pymoo.core.population import Population
+
+from genetic_algorithm.termination import DiversityTermination
+
+
+def algorithm_with(X, xl, xu):
+    return SimpleNamespace(pop=Population.new(X=np.asarray(X, dtype=float)), problem=SimpleNamespace(xl=xl, xu=xu))
+
+
+def test_diversity_ignores_variables_with_equal_bounds():
+    X = np.column_stack([np.linspace(0, 1, 10), np.full(10, 2.0)])
+    termination = DiversityTermination(tol=1e-4)
+    with np.errstate(all="raise"):
+        progress = termination._update(algorithm_with(X, np.array([0.0, 2.0]), np.array([1.0, 2.0])))
+    assert progress == 1e-4 / np.std(X[:, 0])
+
+
+def test_diversity_of_a_fixed_problem_has_collapsed():
+    X = np.full((10, 2), 2.0)
+    assert DiversityTermination()._update(algorithm_with(X, np.full(2, 2.0), np.full(2, 2.0))) == np.inf